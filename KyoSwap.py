@@ -2,7 +2,7 @@ from loguru import logger
 import time
 from config import config, Chains
 from core.bot import Bot
-from core.excel import Excel
+from core.storage import get_storage
 from models.account import Account
 from utils.inputs import input_pause
 from utils.logging import init_logger
@@ -39,7 +39,7 @@ def worker(account: Account) -> None:
 
 def activity(bot: Bot):
 
-    excel_report = Excel(bot.account, file='SoneiumActivity.xlsx')
+    excel_report = get_storage(bot.account, file='SoneiumActivity.xlsx')
     excel_report.set_cell('Address', f'{bot.account.address}')
     excel_report.set_date('Date')
     bot.metamask.auth_metamask()
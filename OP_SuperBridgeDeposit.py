@@ -3,7 +3,7 @@ import time
 from config import config, Chains
 from core.bot import Bot
 from core.onchain import Onchain
-from core.excel import Excel
+from core.storage import get_storage
 from models.account import Account
 from utils.inputs import input_pause, input_deposit_amount
 from utils.logging import init_logger
@@ -46,7 +46,7 @@ def worker(account: Account, amount_input) -> None:
 
 def activity(bot: Bot, amount_input):
 
-    excel_report = Excel(bot.account, file='SoneiumActivity.xlsx')
+    excel_report = get_storage(bot.account, file='SoneiumActivity.xlsx')
     soneium_onchain = Onchain(bot.account, Chains.SONEIUM)
     balance_before = soneium_onchain.get_balance().ether
     if balance_before > amount_input:
@@ -4,7 +4,7 @@ from typing import Tuple
 from loguru import logger
 from config import config, Chains
 from core.bot import Bot
-from core.excel import Excel
+from core.storage import get_storage
 from core.onchain import Onchain
 from models.account import Account
 from models.chain import Chain
@@ -79,7 +79,7 @@ def worker(account: Account, chain, amount_input, input_chain) -> None:
 
 def activity(bot: Bot, chain, amount_input, input_chain):
 
-    excel_report = Excel(bot.account, file='SoneiumActivity.xlsx')
+    excel_report = get_storage(bot.account, file='SoneiumActivity.xlsx')
     multiplier = random.uniform(1.01, 1.05)
     amount_input *= multiplier
     onchain_instance = Onchain(bot.account, Chains.SONEIUM)
@@ -1,7 +1,7 @@
 from loguru import logger
 from config import config, Tokens
 from core.bot import Bot
-from core.excel import Excel
+from core.storage import get_storage
 from core.onchain import Onchain
 from models.account import Account
 from utils.inputs import input_checker_chain, input_token_type
@@ -45,7 +45,7 @@ def activity(bot: Bot, chain, token_type, token_address) -> None:
     get_user_agent()
     global native_balance
     onchain_instance = Onchain(bot.account, chain)
-    excel_report = Excel(bot.account, file='balances.xlsx')
+    excel_report = get_storage(bot.account, file='balances.xlsx')
     if token_type == '1':
         native_balance = onchain_instance.get_balance(address=bot.account.address)
         excel_report.set_cell('Address', f'{bot.account.address}')
@@ -55,17 +55,19 @@ def activity(bot: Bot, chain, token_type, token_address) -> None:
 
     if token_type == '2':
         tokens = Tokens.get_tokens_by_chain(chain)
+        # балансы всех токенов получаем одним multicall запросом
+        balances = onchain_instance.get_balances([bot.account], tokens)[bot.account.address]
         for token in tokens:
-            if token.type_token != 'native':
-                balance = onchain_instance.get_balance(token=token)
-                excel_report.set_cell('Address', f'{bot.account.address}')
-                excel_report.set_date('Date')
-                excel_report.set_cell(f'{token.symbol} {chain.name.upper()}', f'{balance.ether:.2f}')
-                print(f'{token.symbol}: {balance.ether:.2f}')
+            balance = balances[token.address]
+            excel_report.set_cell('Address', f'{bot.account.address}')
+            excel_report.set_date('Date')
+            excel_report.set_cell(f'{token.symbol} {chain.name.upper()}', f'{balance.ether:.2f}')
+            print(f'{token.symbol}: {balance.ether:.2f}')
 
     if token_type == '3' and token_address:
-        balance = onchain_instance.get_balance(token=token_address)
+        # параметры токена берутся из кэша, повторного запроса symbol и decimals нет
         symbol, _ = onchain_instance._get_token_params(token_address)
+        balance = onchain_instance.get_balance(token=token_address)
         excel_report.set_cell('Address', f'{bot.account.address}')
         excel_report.set_date('Date')
         excel_report.set_cell(f'{symbol} {chain.name.upper()}', f'{balance.ether:.2f}')
@@ -0,0 +1,138 @@
+"""
+Сравнение utils.codec (orjson, если установлен) со стандартным json на типичных ответах:
+batch ответ rpc с балансами, eth_feeHistory и список монет Binance /sapi/v1/capital/config/getall.
+По умолчанию данные собраны по формату реальных ответов, значения сгенерированы: в репозитории
+нет записанных ответов, а ключи Binance и ответы rpc в него не коммитятся. Размеры выбраны как у реальных:
+300 адресов в batch, eth_feeHistory на 1024 блока, ~600 монет Binance по нескольку сетей.
+Записанные ответы можно положить в папку как rpc_batch.json, fee_history.json и binance_getall.json,
+тогда они заменят сгенерированные.
+Запуск из корня проекта: python -m benchmarks.json_codec [число повторов] [папка с ответами]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import timeit
+
+from utils import codec
+
+
+def make_batch_response(size: int = 300) -> bytes:
+
+    return json.dumps([
+        {'jsonrpc': '2.0', 'id': request_id, 'result': hex(random.getrandbits(80))}
+        for request_id in range(size)
+    ]).encode()
+
+
+def make_fee_history_response(blocks: int = 1024) -> bytes:
+
+    return json.dumps({
+        'jsonrpc': '2.0',
+        'id': 1,
+        'result': {
+            'oldestBlock': hex(21_000_000),
+            'baseFeePerGas': [hex(random.randint(10 ** 9, 10 ** 11)) for _ in range(blocks + 1)],
+            'gasUsedRatio': [random.random() for _ in range(blocks)],
+            'baseFeePerBlobGas': [hex(1) for _ in range(blocks + 1)],
+            'blobGasUsedRatio': [random.random() for _ in range(blocks)],
+            'reward': [[hex(random.randint(10 ** 6, 10 ** 10))] for _ in range(blocks)],
+        }
+    }).encode()
+
+
+def make_binance_coins_response(coins: int = 600, networks: int = 6) -> bytes:
+
+    return json.dumps([
+        {
+            'coin': f'COIN{coin}',
+            'depositAllEnable': True,
+            'withdrawAllEnable': True,
+            'name': f'Coin {coin}',
+            'free': '0',
+            'locked': '0',
+            'freeze': '0',
+            'withdrawing': '0',
+            'ipoing': '0',
+            'ipoable': '0',
+            'storage': '0',
+            'isLegalMoney': False,
+            'trading': True,
+            'networkList': [
+                {
+                    'network': f'NET{network}',
+                    'coin': f'COIN{coin}',
+                    'withdrawIntegerMultiple': '0.00000001',
+                    'isDefault': network == 0,
+                    'depositEnable': True,
+                    'withdrawEnable': True,
+                    'depositDesc': '',
+                    'withdrawDesc': '',
+                    'specialTips': '',
+                    'name': f'Network {network}',
+                    'resetAddressStatus': False,
+                    'addressRegex': '^(0x)[0-9A-Fa-f]{40}$',
+                    'memoRegex': '',
+                    'withdrawFee': '0.0001',
+                    'withdrawMin': '0.001',
+                    'withdrawMax': '9999999999.99999999',
+                    'minConfirm': 12,
+                    'unLockConfirm': 0,
+                    'sameAddress': False,
+                    'estimatedArrivalTime': 5,
+                    'busy': False,
+                    'contractAddressUrl': 'https://etherscan.io/address/',
+                    'contractAddress': '0x' + '0' * 40,
+                }
+                for network in range(networks)
+            ],
+        }
+        for coin in range(coins)
+    ]).encode()
+
+
+def load_payloads(fixtures_path: str | None = None) -> dict[str, bytes]:
+    """
+    Собирает ответы для сравнения, записанные ответы из папки заменяют сгенерированные.
+    :param fixtures_path: папка с записанными ответами
+    :return: словарь название - тело ответа
+    """
+
+    payloads = {
+        'rpc batch': ('rpc_batch.json', make_batch_response),
+        'fee_history': ('fee_history.json', make_fee_history_response),
+        'binance getall': ('binance_getall.json', make_binance_coins_response),
+    }
+    result = {}
+    for name, (file_name, make_response) in payloads.items():
+        path = os.path.join(fixtures_path, file_name) if fixtures_path else None
+        if path and os.path.isfile(path):
+            with open(path, 'rb') as file:
+                result[f'{name} (запись)'] = file.read()
+        else:
+            result[name] = make_response()
+    return result
+
+
+def main() -> None:
+
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    payloads = load_payloads(sys.argv[2] if len(sys.argv) > 2 else None)
+
+    print(f'Кодек: {codec.NAME}, повторов: {number}')
+    for name, payload in payloads.items():
+        decoded = json.loads(payload)
+        json_loads = timeit.timeit(lambda: json.loads(payload), number=number) / number * 1000
+        codec_loads = timeit.timeit(lambda: codec.loads(payload), number=number) / number * 1000
+        json_dumps = timeit.timeit(lambda: json.dumps(decoded).encode(), number=number) / number * 1000
+        codec_dumps = timeit.timeit(lambda: codec.dumps(decoded), number=number) / number * 1000
+        print(f'{name:>24} ({len(payload) // 1024} КБ): '
+              f'loads json {json_loads:.2f} мс / codec {codec_loads:.2f} мс, '
+              f'dumps json {json_dumps:.2f} мс / codec {codec_dumps:.2f} мс')
+
+
+if __name__ == '__main__':
+    main()
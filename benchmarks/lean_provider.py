@@ -0,0 +1,77 @@
+"""
+Сравнение стандартного web3 и облегченного профиля ProviderRegistry (config.is_lean_provider).
+Считает число HTTP запросов к rpc и время типичных чтений Onchain: eth_call, estimate_gas, get_balance.
+Запуск из корня проекта: python -m benchmarks.lean_provider [имя сети] [число итераций]
+"""
+
+import sys
+import time
+
+from web3 import Web3
+
+from config import Chains
+from core.onchain import MULTICALL3_ABI
+from core.provider import LEAN_MIDDLEWARE, PooledHTTPProvider, RpcSession
+from models.chain import Chain
+
+# адрес без кода и с нулевым балансом, для оценки газа достаточно любого адреса
+TEST_ADDRESS = Web3.to_checksum_address('0x000000000000000000000000000000000000dEaD')
+
+
+class CountingRpcSession(RpcSession):
+    """
+    RpcSession, которая считает отправленные HTTP запросы
+    """
+
+    def __init__(self, rpcs: list[str]) -> None:
+        super().__init__(rpcs)
+        self.requests_count = 0
+
+    def make_post_request(self, endpoint_uri: str, data: bytes | str, **kwargs) -> bytes:
+
+        self.requests_count += 1
+        return super().make_post_request(endpoint_uri, data, **kwargs)
+
+
+def run_profile(chain: Chain, is_lean: bool, iterations: int) -> tuple[int, float]:
+    """
+    Выполняет набор чтений через web3 выбранного профиля.
+    :param chain: сеть
+    :param is_lean: облегченный профиль
+    :param iterations: число повторов набора
+    :return: (число HTTP запросов, среднее время набора в мс)
+    """
+
+    rpc_session = CountingRpcSession(chain.rpcs)
+    rpc_session.warm_up()
+    rpc_session.requests_count = 0
+
+    if is_lean:
+        w3 = Web3(PooledHTTPProvider(rpc_session, chain_id=chain.chain_id), middleware=LEAN_MIDDLEWARE)
+    else:
+        w3 = Web3(PooledHTTPProvider(rpc_session))
+    multicall = w3.eth.contract(Web3.to_checksum_address(chain.multicall_address), abi=MULTICALL3_ABI)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        multicall.functions.getEthBalance(TEST_ADDRESS).call()
+        w3.eth.estimate_gas({'from': TEST_ADDRESS, 'to': TEST_ADDRESS, 'value': 0, 'chainId': chain.chain_id})
+        w3.eth.get_balance(TEST_ADDRESS)
+    elapsed = (time.perf_counter() - started) / iterations * 1000
+    return rpc_session.requests_count, elapsed
+
+
+def main() -> None:
+
+    chain = Chains.get_chain(sys.argv[1]) if len(sys.argv) > 1 else Chains.ETHEREUM
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print(f'Сеть: {chain.name}, итераций: {iterations}')
+    for name, is_lean in (('стандартный', False), ('облегченный', True)):
+        requests_count, elapsed = run_profile(chain, is_lean, iterations)
+        print(f'{name:>12}: запросов {requests_count:>4} ({requests_count / iterations:.1f} на набор), '
+              f'{elapsed:.1f} мс на набор')
+
+
+if __name__ == '__main__':
+    main()
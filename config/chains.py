@@ -10,16 +10,25 @@ class Chains:
 
     ETHEREUM = Chain(
         name='ethereum',
-        rpc='https://1rpc.io/eth',
+        rpc=[
+            'https://1rpc.io/eth',
+            'https://ethereum-rpc.publicnode.com',
+            'https://eth.llamarpc.com',
+        ],
         chain_id=1,
         metamask_name='Ethereum Mainnet',
         native_token='ETH',
-        okx_name='ERC20'
+        okx_name='ERC20',
+        block_time=12,
+        ws='wss://ethereum-rpc.publicnode.com'
     )
 
     LINEA = Chain(
         name='linea',
-        rpc='https://1rpc.io/linea',
+        rpc=[
+            'https://1rpc.io/linea',
+            'https://rpc.linea.build',
+        ],
         chain_id=59144,
         metamask_name='Linea',
         native_token='ETH',
@@ -28,65 +37,105 @@ class Chains:
 
     ARBITRUM_ONE = Chain(
         name='arbitrum_one',
-        rpc='https://1rpc.io/arb',
+        rpc=[
+            'https://1rpc.io/arb',
+            'https://arb1.arbitrum.io/rpc',
+            'https://arbitrum-one-rpc.publicnode.com',
+        ],
         chain_id=42161,
         metamask_name='Arbitrum One',
         native_token='ETH',
-        okx_name='Arbitrum One'
+        okx_name='Arbitrum One',
+        block_time=0.25,
+        native_transfer_gas=None,
+        ws='wss://arbitrum-one-rpc.publicnode.com'
     )
 
     BSC = Chain(
         name='bsc',
-        rpc='https://1rpc.io/bnb',
+        rpc=[
+            'https://1rpc.io/bnb',
+            'https://bsc-rpc.publicnode.com',
+            'https://bsc-dataseed.bnbchain.org',
+        ],
         chain_id=56,
         metamask_name='Binance Smart Chain',
         native_token='BNB',
-        okx_name='BSC'
+        okx_name='BSC',
+        block_time=3,
+        ws='wss://bsc-rpc.publicnode.com'
     )
 
     OP = Chain(
         name='op',
-        rpc='https://1rpc.io/op',
+        rpc=[
+            'https://1rpc.io/op',
+            'https://mainnet.optimism.io',
+            'https://optimism-rpc.publicnode.com',
+        ],
         chain_id=10,
         native_token='ETH',
         metamask_name='Optimism Mainnet',
-        okx_name='Optimism'
+        okx_name='Optimism',
+        ws='wss://optimism-rpc.publicnode.com',
+        is_op_stack=True
     )
 
     POLYGON = Chain(
         name='polygon',
-        rpc='https://1rpc.io/matic',
+        rpc=[
+            'https://1rpc.io/matic',
+            'https://polygon-rpc.com',
+            'https://polygon-bor-rpc.publicnode.com',
+        ],
         chain_id=137,
         native_token='POL',
         metamask_name='Polygon',
-        okx_name='Polygon'
+        okx_name='Polygon',
+        ws='wss://polygon-bor-rpc.publicnode.com'
     )
 
     ZKSYNC = Chain(
         name='zksync',
-        rpc='https://1rpc.io/zksync2-era',
+        rpc=[
+            'https://1rpc.io/zksync2-era',
+            'https://mainnet.era.zksync.io',
+        ],
         chain_id=324,
         native_token='ETH',
         metamask_name='zkSync',
-        okx_name='zkSync Era'
+        okx_name='zkSync Era',
+        multicall_address='0xF9cda624FBC7e059355ce98a31693d299FACd963',
+        block_time=1,
+        native_transfer_gas=None
     )
 
     BASE = Chain(
         name='base',
-        rpc='https://1rpc.io/base',
+        rpc=[
+            'https://1rpc.io/base',
+            'https://mainnet.base.org',
+            'https://base-rpc.publicnode.com',
+        ],
         chain_id=8453,
         native_token='ETH',
         metamask_name='Base',
-        okx_name='Base'
+        okx_name='Base',
+        ws='wss://base-rpc.publicnode.com',
+        is_op_stack=True
     )
 
     SCROLL = Chain(
         name='scroll',
-        rpc='https://1rpc.io/scroll',
+        rpc=[
+            'https://1rpc.io/scroll',
+            'https://rpc.scroll.io',
+        ],
         chain_id=534352,
         native_token='ETH',
         metamask_name='Scroll',
-        okx_name='Scroll'
+        okx_name='Scroll',
+        block_time=3
     )
 
     GRAVITY = Chain(
@@ -95,21 +144,30 @@ class Chains:
         chain_id=1625,
         native_token='G',
         metamask_name='Gravity',
+        native_transfer_gas=None
     )
 
     SONEIUM = Chain(
         name='soneium',
-        rpc='https://soneium.drpc.org',
+        rpc=[
+            'https://soneium.drpc.org',
+            'https://rpc.soneium.org',
+        ],
         chain_id=1868,
         metamask_name='Soneium',
+        is_op_stack=True
     )
 
     UNICHAIN = Chain(
         name='unichain',
-        rpc='https://unichain-rpc.publicnode.com',
+        rpc=[
+            'https://unichain-rpc.publicnode.com',
+            'https://mainnet.unichain.org',
+        ],
         chain_id=130,
         native_token='ETH',
         metamask_name='Unichain',
+        is_op_stack=True
     )
 
     ZORA = Chain(
@@ -118,6 +176,7 @@ class Chains:
         chain_id=7777777,
         native_token='ETH',
         metamask_name='Zora',
+        is_op_stack=True
     )
 
     MONAD_TESTNET = Chain(
@@ -126,14 +185,19 @@ class Chains:
         chain_id=143,
         native_token='MON',
         metamask_name='MONAD TESTNET',
+        block_time=0.5
     )
 
     SEPOLIA_TESTNET = Chain(
         name='sepolia_testnet',
-        rpc='https://1rpc.io/sepolia',
+        rpc=[
+            'https://1rpc.io/sepolia',
+            'https://ethereum-sepolia-rpc.publicnode.com',
+        ],
         chain_id=11155111,
         native_token='ETH',
         metamask_name='Sepolia',
+        block_time=12
     )
 
     # FTM = Chain(
@@ -10,6 +10,48 @@ class Config:
     # использовать ли прокси аккаунта для подключения к rpc провайдеру
     is_web3_proxy = True
 
+    # максимум keep-alive соединений к одному rpc провайдеру через один прокси
+    rpc_pool_size = 10
+    # сколько rpc сессий (сеть + прокси) держать открытыми, давно не использованные закрываются
+    # при работе с прокси аккаунтов у каждого аккаунта свои сессии, без лимита копятся открытые сокеты
+    rpc_sessions_limit = 50
+    # таймаут запроса к rpc провайдеру в секундах
+    rpc_timeout = 30
+    # сколько ошибок 429/5xx подряд выключают rpc и на сколько секунд, запросы уходят на другие rpc сети
+    rpc_breaker_failures = 3
+    rpc_breaker_cooldown = 60
+    # дублировать запросы на чтение на второй rpc, если первый не ответил за свое обычное время (p90)
+    # срезает редкие зависания публичных rpc ценой лишних запросов, работает если у сети несколько rpc
+    is_hedged_reads = False
+    # через сколько секунд дублировать запрос, пока по rpc не накоплена статистика
+    hedge_delay = 1.0
+    # облегченный web3 для Onchain: chain_id берется из config/chains.py без запросов eth_chainId,
+    # отключены проверки и middleware, которые Onchain не использует (ENS, стратегия цены газа)
+    is_lean_provider = True
+    # максимум одновременных соединений AsyncOnchain на весь event loop
+    async_rpc_limit = 100
+    # сколько аккаунтов tx_counter опрашивает одновременно
+    async_accounts_limit = 20
+    # сколько вызовов balanceOf упаковывать в один aggregate3 запрос multicall
+    # уменьшите, если rpc провайдер отклоняет запросы по лимиту газа или размеру ответа
+    multicall_chunk_size = 300
+
+    # не ждать подтверждения транзакций, квитанции собирает фоновый трекер
+    # дождаться всех отправленных транзакций можно через Onchain.wait_pending()
+    is_fire_and_track = False
+    # сколько секунд ждать квитанцию транзакции в фоновом трекере
+    receipt_timeout = 300
+    # сколько получателей Onchain.disperse упаковывать в одну транзакцию multicall и в один batch запрос
+    disperse_chunk_size = 200
+    # сколько eth_sendRawTransaction и eth_getTransactionCount отправлять одним batch запросом в BulkSender
+    broadcast_batch_size = 100
+    # число процессов для подписи транзакций и вывода ключей из сид фраз, 0 - по числу ядер
+    process_workers = 0
+    # с какого количества транзакций подписывать в пуле процессов, меньше - быстрее в текущем процессе
+    sign_parallel_threshold = 200
+    # с какого количества сид фраз выводить ключи в пуле процессов
+    derive_parallel_threshold = 20
+
     # okx прокси, укажите прокси для работы с биржей okx, если вы находитесь в РФ
     okx_proxy = ''  # формат 'ip:port:login:password'
 
@@ -42,6 +84,14 @@ class Config:
 
     # формат даты в excel, не меняйте если не знаете что делаете
     date_format = '%d/%m/%Y %H:%M:%S'
+    # изменения excel сохраняются в файл не чаще раза в столько секунд или после стольких изменений
+    # 0 - сохранять каждое изменение сразу
+    excel_flush_interval = 30
+    excel_flush_threshold = 100
+    # где скрипты хранят отчеты (счетчики, даты, суммы): 'excel' - файлы .xlsx, 'sqlite' - база config/data/storage.db
+    # sqlite быстрее и безопасна при запуске нескольких скриптов сразу, выгрузка в .xlsx:
+    # python -m core.storage export, загрузка .xlsx в базу: python -m core.storage import SoneiumActivity.xlsx
+    storage_backend = 'excel'  # excel, sqlite
 
     # случайный порядок аккаунтов
     is_random = False  # Если True, то аккаунты будут выбираться случайно, иначе по порядку
@@ -74,6 +124,8 @@ class Config:
 
     # лимит газа для метода ожидания нужного газа gas_price_wait
     gas_price_limit = 60
+    # лимиты газа для отдельных сетей, ключ - имя сети, например {'ethereum': 10, 'base': 0.05}
+    gas_price_limits = {}
 
     # адрес расширения в браузере ADS
     metamask_url = 'chrome-extension://nkbihfbeogaeaoehlefnkodbefgpgknn/home.html'
@@ -93,6 +145,7 @@ class Config:
     PATH_ABI = os.path.join(PATH_DATA, 'ABIs')
     PATH_LOG = os.path.join(os.getcwd(), 'logs')
     PATH_EXCEL = os.path.join(PATH_DATA, 'accounts.xlsx')
+    PATH_DB = os.path.join(PATH_DATA, 'storage.db')
 
 
 config = Config()
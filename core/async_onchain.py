@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+from eth_typing import ChecksumAddress
+from loguru import logger
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3.contract import AsyncContract
+
+from config import config, Tokens
+from core.gas_monitor import GasMonitor
+from core.key_derivation import KeyDerivation
+from core.l1_fee_oracle import L1FeeOracle, GAS_PRICE_ORACLE_ABI, GAS_PRICE_ORACLE_ADDRESS
+from core.provider import ProviderRegistry
+from core.token_cache import TokenMetadataCache
+from models.account import Account
+from models.amount import Amount
+from models.chain import Chain
+from models.contract_raw import ContractRaw
+from models.token import Token, TokenTypes
+from utils.utils import to_checksum, get_multiplayer, get_user_agent, prepare_proxy_http
+
+
+class AsyncOnchain:
+    """
+    Асинхронный двойник Onchain на AsyncWeb3.
+    Все экземпляры одного event loop используют общую aiohttp сессию из ProviderRegistry.
+    """
+
+    def __init__(self, account: Account, chain: Chain):
+        self.account = account
+        self.chain = chain
+        request_kwargs = {
+            'headers': {
+                'User-Agent': get_user_agent(),
+                "Content-Type": "application/json",
+            }
+        }
+        if config.is_web3_proxy and self.account.proxy:
+            request_kwargs['proxy'] = prepare_proxy_http(self.account.proxy)
+
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(chain.rpc, request_kwargs=request_kwargs))
+        self._is_connected = False
+        self._l1_oracle_contract: Optional[AsyncContract] = None
+        if self.account.private_key:
+            if not self.account.address:
+                self.account.address = KeyDerivation.get_address(self.account.private_key)
+
+    async def _connect(self) -> None:
+
+        if self._is_connected:
+            return
+        session = await ProviderRegistry.get_async_session()
+        await self.w3.provider.cache_async_session(session)
+        self._is_connected = True
+
+    async def _get_token_params(self, token_address: str | ChecksumAddress) -> tuple[str, int]:
+
+        token_contract_address = to_checksum(token_address)
+
+        if token_contract_address == Tokens.NATIVE_TOKEN.address:
+            return self.chain.native_token, Tokens.NATIVE_TOKEN.decimals
+
+        token_params = TokenMetadataCache.get(self.chain, token_contract_address)
+        if token_params:
+            return token_params
+
+        await self._connect()
+        token_contract_raw = ContractRaw(token_contract_address, 'erc20', self.chain)
+        token_contract = self._get_contract(token_contract_raw)
+        decimals, symbol = await asyncio.gather(
+            token_contract.functions.decimals().call(),
+            token_contract.functions.symbol().call()
+        )
+        TokenMetadataCache.set(self.chain, token_contract_address, symbol, decimals)
+        return symbol, decimals
+
+    async def _get_token(self, token: Optional[Token | str | ChecksumAddress]) -> Token:
+
+        if token is None:
+            return Tokens.NATIVE_TOKEN
+
+        if isinstance(token, str):
+            if to_checksum(token) == Tokens.NATIVE_TOKEN.address:
+                return Tokens.NATIVE_TOKEN
+            symbol, decimals = await self._get_token_params(token)
+            return Token(symbol, token, self.chain, decimals)
+
+        return token
+
+    def _get_contract(self, contract_raw: ContractRaw) -> AsyncContract:
+
+        return self.w3.eth.contract(contract_raw.address, abi=contract_raw.abi)
+
+    async def _estimate_gas(self, tx: dict) -> None:
+
+        tx['gas'] = int(await self.w3.eth.estimate_gas(tx) * get_multiplayer())
+
+    async def _get_fee(self, tx_params: dict[str, str | int] | None = None) -> dict[str, str | int]:
+
+        if tx_params is None:
+            tx_params = {}
+
+        fee_history = None
+
+        if self.chain.is_eip1559 is None:
+            fee_history = await self.w3.eth.fee_history(20, 'latest', [40])
+            self.chain.is_eip1559 = any(fee_history.get('baseFeePerGas', [0]))
+
+        if self.chain.is_eip1559 is False:
+            tx_params['gasPrice'] = int(await self.w3.eth.gas_price * get_multiplayer())
+            return tx_params
+
+        fee_history = fee_history or await self.w3.eth.fee_history(20, 'latest', [40])
+        base_fee = fee_history.get('baseFeePerGas', [0])[-1]
+        priority_fees = [fee[0] for fee in fee_history.get('reward', [[0]]) if fee[0] != 0] or [0]
+        median_index = len(priority_fees) // 2
+        priority_fees.sort()
+        median_priority_fee = priority_fees[median_index]
+
+        priority_fee = self._multiply(median_priority_fee)
+        max_fee = self._multiply(base_fee + priority_fee)
+
+        tx_params['type'] = '0x2'
+        tx_params['maxFeePerGas'] = max_fee
+        tx_params['maxPriorityFeePerGas'] = priority_fee
+
+        return tx_params
+
+    def _multiply(self, value: int, min_mult: float = 1.03, max_mult: float = 1.1) -> int:
+
+        return int(value * get_multiplayer(min_mult, max_mult) * self.chain.multiplier)
+
+    async def _get_l1_fee(self, tx_params: dict[str, str | int]) -> Amount:
+
+        if not self.chain.is_op_stack:
+            return Amount(0, wei=True)
+
+        oracle = L1FeeOracle.get(self.chain)
+        data = tx_params.get('data') or '0x'
+        l1_fee = oracle.estimate(data)
+        if l1_fee is not None:
+            return Amount(l1_fee, wei=True)
+
+        await self._connect()
+        if self._l1_oracle_contract is None:
+            self._l1_oracle_contract = self.w3.eth.contract(
+                address=to_checksum(GAS_PRICE_ORACLE_ADDRESS), abi=GAS_PRICE_ORACLE_ABI
+            )
+        functions = self._l1_oracle_contract.functions
+        l1_fee, *scalars = await asyncio.gather(
+            functions.getL1Fee(data).call(),
+            *(getattr(functions, function_name)().call() for function_name in L1FeeOracle.SCALAR_FUNCTIONS),
+            return_exceptions=True
+        )
+        if isinstance(l1_fee, Exception):
+            raise l1_fee
+        oracle.set_scalars(*(None if isinstance(scalar, Exception) else scalar for scalar in scalars))
+        return Amount(l1_fee, wei=True)
+
+    async def _prepare_tx(self, value: Optional[Amount] = None,
+                          to_address: Optional[str | ChecksumAddress] = None) -> dict:
+
+        # комиссию и nonce запрашиваем одновременно
+        tx_params, nonce = await asyncio.gather(
+            self._get_fee(),
+            self.w3.eth.get_transaction_count(self.account.address)
+        )
+
+        tx_params['from'] = self.account.address
+        tx_params['nonce'] = nonce
+        tx_params['chainId'] = self.chain.chain_id
+
+        if value:
+            tx_params['value'] = value.wei
+
+        if to_address:
+            tx_params['to'] = to_address
+
+        return tx_params
+
+    async def _sign_and_send(self, tx: dict) -> str:
+
+        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account.private_key)
+        tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        tx_receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        if tx_receipt['status'] != 1:
+            logger.error(f'{self.account.profile_number} Транзакция {tx_hash.to_0x_hex()} завершилась с ошибкой '
+                         f'в сети {self.chain.name}')
+            raise ValueError(f'Транзакция {tx_hash.to_0x_hex()} завершилась с ошибкой')
+        return tx_receipt['transactionHash'].hex()
+
+    async def get_balance(
+            self,
+            *,
+            token: Optional[Token | str | ChecksumAddress] = None,
+            address: Optional[str | ChecksumAddress] = None
+    ) -> Amount:
+
+        await self._connect()
+        token = await self._get_token(token)
+
+        # если не указан адрес, то берем адрес аккаунта
+        address = to_checksum(address or self.account.address)
+
+        if token.type_token == TokenTypes.NATIVE:
+            native_balance = await self.w3.eth.get_balance(address)
+            return Amount(native_balance, wei=True)
+
+        contract = self._get_contract(token)
+        erc20_balance_wei = await contract.functions.balanceOf(address).call()
+        return Amount(erc20_balance_wei, decimals=token.decimals, wei=True)
+
+    async def _validate_native_transfer_value(self, tx_params: dict) -> None:
+
+        amount = Amount(tx_params['value'], wei=True)
+        l1_fee, gues_gas, balance = await asyncio.gather(
+            self._get_l1_fee(tx_params),
+            self.w3.eth.estimate_gas({'from': self.account.address, 'to': self.account.address, 'value': 1}),
+            self.get_balance()
+        )
+        gues_gas_price = tx_params.get('maxFeePerGas', tx_params.get('gasPrice'))
+        fee_spend = self._multiply(l1_fee.wei + gues_gas * gues_gas_price, 1.1, 1.2)
+        if balance.wei - fee_spend - amount.wei > 0:
+            return
+
+        message = f'баланс {self.chain.native_token}: {balance}, сумма: {amount} to {tx_params["to"]}'
+        logger.warning(
+            f'{self.account.profile_number} Недостаточно средств для отправки транзакции, {message}'
+            f'Отправляем все доступные средства')
+        tx_params['value'] = int(balance.wei - self._multiply(fee_spend, 1.1, 1.2))
+        if tx_params['value'] > 0:
+            return
+        logger.error(f'{self.account.profile_number} Недостаточно средств для отправки транзакции')
+        raise ValueError('Недостаточно средств для отправки нативного токена')
+
+    async def send_token(self,
+                         to_address: str | ChecksumAddress,
+                         amount: Amount | int | float | None = None,
+                         token: Optional[Token | str | ChecksumAddress] = None
+                         ) -> str:
+
+        await self._connect()
+        token = await self._get_token(token)
+        if token.type_token == TokenTypes.NATIVE:
+            token.chain = self.chain
+            token.symbol = self.chain.native_token
+
+        if amount is None:
+            amount = Amount((await self.get_balance(token=token)).wei, decimals=token.decimals, wei=True)
+
+        to_address = to_checksum(to_address)
+
+        if not isinstance(amount, Amount):
+            amount = Amount(amount, decimals=token.decimals)
+
+        if token.type_token == TokenTypes.NATIVE:
+            tx_params = await self._prepare_tx(amount, to_address)
+            await self._validate_native_transfer_value(tx_params)
+            amount = Amount(tx_params['value'], wei=True)
+        else:
+            balance, native_balance = await asyncio.gather(self.get_balance(token=token), self.get_balance())
+            if balance.wei < amount.wei:
+                amount = balance
+            if amount.wei <= 0:
+                logger.error(
+                    f'{self.account.profile_number}: Ошибка: Баланс: {amount.ether:.2f} {token.symbol}')
+                raise ValueError(f'Недостаточно средств для отправки транзакции!')
+
+            if native_balance <= 0:
+                logger.error(
+                    f'{self.account.profile_number}: Ошибка: Нативный баланс недостаточный: {native_balance.ether:.5f} {self.chain.native_token}.')
+                raise ValueError(f'Недостаточно средств для отправки транзакции!')
+            contract = self._get_contract(token)
+            tx_params = await self._prepare_tx()
+            tx_params = await contract.functions.transfer(to_address, amount.wei).build_transaction(tx_params)
+
+        await self._estimate_gas(tx_params)
+        tx_hash = await self._sign_and_send(tx_params)
+        message = f'Cумма: {amount} {token.symbol} | На адрес: {to_address} | Tx hash: {tx_hash}'
+        logger.info(f'Транзакция отправлена! {message}')
+        return tx_hash
+
+    async def _get_allowance(self, token: Token, spender: str | ChecksumAddress | ContractRaw) -> Amount:
+
+        if isinstance(spender, ContractRaw):
+            spender = spender.address
+
+        spender = to_checksum(spender)
+        contract = self._get_contract(token)
+        allowance = await contract.functions.allowance(self.account.address, spender).call()
+        return Amount(allowance, decimals=token.decimals, wei=True)
+
+    async def approve(self, token: Optional[Token], amount: Amount | int | float,
+                      spender: str | ChecksumAddress | ContractRaw) -> None:
+
+        if token is None or token.type_token == TokenTypes.NATIVE:
+            return
+
+        await self._connect()
+
+        if isinstance(amount, (int, float)):
+            amount = Amount(amount, decimals=token.decimals)
+
+        if (await self._get_allowance(token, spender)).wei >= amount.wei:
+            return
+
+        if isinstance(spender, ContractRaw):
+            spender = spender.address
+
+        contract = self._get_contract(token)
+        tx_params = await self._prepare_tx()
+
+        tx_params = await contract.functions.approve(spender, amount.wei).build_transaction(tx_params)
+        await self._estimate_gas(tx_params)
+        await self._sign_and_send(tx_params)
+        message = f'approve {amount} {token.symbol} to {spender}'
+        logger.info(f'{self.account.profile_number} Транзакция отправлена {message}')
+
+    async def get_gas_price(self, gwei: bool = True) -> int | float:
+
+        await self._connect()
+        gas_price = await self.w3.eth.gas_price
+        if gwei:
+            return gas_price / 10 ** 9
+        return gas_price
+
+    async def gas_price_wait(self, gas_limit: int = None) -> None:
+
+        if not gas_limit:
+            gas_limit = GasMonitor.get_limit(self.chain)
+
+        gas_price = await self.get_gas_price()
+        if gas_price <= gas_limit:
+            return
+
+        logger.warning(f'Цена Gas высокая: {gas_price}! Ожидаем снижение.')
+        # монитор общий с синхронным Onchain, ждем его в отдельном потоке, не блокируя event loop
+        monitor = GasMonitor.get(self.chain, ProviderRegistry.get_proxy(self.account.proxy))
+        gas_price = await asyncio.to_thread(monitor.wait_below, gas_limit)
+        logger.success(f'Цена Gas восстановлена: {gas_price}! Продолжаем активности.')
+
+    async def get_tx_count(self, address: Optional[str | ChecksumAddress] = None) -> int:
+
+        await self._connect()
+        address = to_checksum(address or self.account.address)
+
+        nonce = await self.w3.eth.get_transaction_count(address)
+        logger.info(f'{self.account.profile_number}: Количество транзакций в сети {self.chain.name.upper()}: {nonce}')
+        return nonce
+
+
+if __name__ == '__main__':
+    pass
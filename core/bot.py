@@ -4,6 +4,7 @@ from core.browser import Ads, Metamask
 from core.excel import Excel
 from core.exchanges import Exchanges
 from core.onchain import Onchain
+from core.provider import ProviderRegistry
 from models.chain import Chain
 from models.account import Account
 from config import config
@@ -14,6 +15,8 @@ class Bot:
         logger.info(f'{account.profile_number} Запуск профиля!')
         self.chain = chain
         self.account = account
+        # rpc сессии аккаунта прогреваются в фоне, пока запускается браузер
+        ProviderRegistry.warm_up_account(account.proxy, [chain])
         self.ads = Ads(account)
         self.excel = Excel(account)
         self.metamask = Metamask(self.ads, account, self.excel)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from eth_account import Account as EthAccount
+from eth_utils import keccak
+from hexbytes import HexBytes
+from loguru import logger
+
+from config import config
+from core.nonce_manager import NonceManager
+from core.provider import ProviderRegistry
+from core.receipt_tracker import ReceiptTracker
+from models.account import Account
+from models.chain import Chain
+
+
+def sign_transaction(tx: dict, private_key: str) -> bytes:
+    """
+    Подписывает транзакцию, функция уровня модуля, чтобы ее можно было выполнить в дочернем процессе.
+    :param tx: транзакция с nonce
+    :param private_key: приватный ключ
+    :return: подписанная транзакция
+    """
+
+    return bytes(EthAccount.sign_transaction(tx, private_key).raw_transaction)
+
+
+class BulkSender:
+    """
+    Массовая отправка готовых транзакций многих аккаунтов в одной сети.
+    Nonce всех аккаунтов запрашиваются batch запросом, транзакции подписываются
+    в пуле процессов на этой машине, затем отправляются batch запросами eth_sendRawTransaction.
+    Все запросы идут через одно соединение, прокси аккаунтов не используются.
+    Если rpc не принимает batch, PooledHTTPProvider отправляет запросы по одному.
+    """
+
+    def __init__(self, chain: Chain, proxy: Optional[str] = None) -> None:
+        self.chain = chain
+        self.proxy = proxy
+        self.w3 = ProviderRegistry.get_web3(chain, proxy)
+
+    def _seed_nonces(self, addresses: list[str]) -> None:
+
+        addresses = [address for address in dict.fromkeys(addresses)
+                     if not NonceManager.is_seeded(self.chain, address)]
+        batch_size = config.broadcast_batch_size
+        for start in range(0, len(addresses), batch_size):
+            chunk = addresses[start:start + batch_size]
+            responses = self.w3.provider.make_batch_request(
+                [('eth_getTransactionCount', [address, 'pending']) for address in chunk]
+            )
+            for address, response in zip(chunk, responses):
+                if 'result' in response:
+                    NonceManager.seed(self.chain, address, int(response['result'], 16))
+
+    def sign(self, items: list[tuple[Account, dict]]) -> list[HexBytes]:
+        """
+        Выдает nonce и подписывает транзакции, при большом количестве - в пуле процессов.
+        :param items: список (аккаунт, транзакция без nonce)
+        :return: подписанные транзакции в том же порядке
+        """
+
+        self._seed_nonces([account.address for account, _ in items])
+        for account, tx in items:
+            tx['nonce'] = NonceManager.get_nonce(self.w3, self.chain, account.address)
+
+        txs = [tx for _, tx in items]
+        private_keys = [account.private_key for account, _ in items]
+        if len(items) < config.sign_parallel_threshold:
+            return [HexBytes(sign_transaction(tx, key)) for tx, key in zip(txs, private_keys)]
+
+        workers = config.process_workers or os.cpu_count() or 1
+        chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            raw_txs = executor.map(sign_transaction, txs, private_keys, chunksize=chunksize)
+            return [HexBytes(raw_tx) for raw_tx in raw_txs]
+
+    def broadcast(self, raw_txs: list[HexBytes],
+                  labels: Optional[list[str | int]] = None) -> list[Optional[HexBytes]]:
+        """
+        Отправляет подписанные транзакции batch запросами eth_sendRawTransaction.
+        Хэши считаются локально по подписанным транзакциям. Если пачка не отправилась без ответа rpc,
+        ее транзакции могли попасть в сеть, их хэши возвращаются, чтобы дождаться квитанций.
+        Транзакции с ошибкой в ответе ищутся в сети, не найденные считаются не принятыми.
+        :param raw_txs: подписанные транзакции
+        :param labels: подписи для логов, обычно номера профилей
+        :return: хэши в том же порядке, None если транзакция не принята
+        """
+
+        labels = labels or [''] * len(raw_txs)
+        tx_hashes = [HexBytes(keccak(raw_tx)) for raw_tx in raw_txs]
+        errors = {}
+        batch_size = config.broadcast_batch_size
+        for start in range(0, len(raw_txs), batch_size):
+            chunk = raw_txs[start:start + batch_size]
+            try:
+                responses = self.w3.provider.make_batch_request(
+                    [('eth_sendRawTransaction', [raw_tx.to_0x_hex()]) for raw_tx in chunk]
+                )
+            except Exception as error:
+                logger.warning(f'{self.chain.name} Нет ответа на отправку пачки транзакций, '
+                               f'ждем их квитанции: {error}')
+                continue
+            for index, response in enumerate(responses, start):
+                if 'result' not in response:
+                    errors[index] = response.get('error')
+
+        # ошибка в ответе не всегда значит, что транзакции нет: already known, обрыв при отправке по одному
+        for index in self._find_missing([tx_hashes[index] for index in errors], list(errors)):
+            logger.error(f'{labels[index]} Транзакция не принята в сети {self.chain.name}: {errors[index]}')
+            tx_hashes[index] = None
+        return tx_hashes
+
+    def _find_missing(self, tx_hashes: list[HexBytes], indexes: list[int]) -> list[int]:
+
+        missing = []
+        batch_size = config.broadcast_batch_size
+        for start in range(0, len(tx_hashes), batch_size):
+            chunk = tx_hashes[start:start + batch_size]
+            try:
+                responses = self.w3.provider.make_batch_request(
+                    [('eth_getTransactionByHash', [tx_hash.to_0x_hex()]) for tx_hash in chunk]
+                )
+            except Exception as error:
+                logger.debug(f'{self.chain.name} Не удалось проверить транзакции в сети: {error}')
+                responses = [{}] * len(chunk)
+            missing += [index for index, response in zip(indexes[start:start + batch_size], responses)
+                        if not response.get('result')]
+        return missing
+
+    def send(self, items: list[tuple[Account, dict]],
+             wait: bool = True) -> list[tuple[Optional[str], Optional[bool]]]:
+        """
+        Подписывает и отправляет транзакции многих аккаунтов.
+        :param items: список (аккаунт, транзакция без nonce), например из Onchain.prepare
+        :param wait: дождаться квитанций
+        :return: список (хэш, статус) в формате Onchain.disperse в том же порядке: True - подтверждена,
+            False - откатилась или не принята rpc (тогда хэш None), None - квитанцию не ждали
+            или не дождались, транзакция еще может пройти
+        """
+
+        raw_txs = self.sign(items)
+        labels = [account.profile_number for account, _ in items]
+        tx_hashes = self.broadcast(raw_txs, labels)
+
+        sent = sum(1 for tx_hash in tx_hashes if tx_hash)
+        logger.info(f'{self.chain.name} Отправлено транзакций: {sent} из {len(items)}')
+        if not wait:
+            results = [(tx_hash.hex(), None) if tx_hash else (None, False) for tx_hash in tx_hashes]
+        else:
+            tracker = ReceiptTracker.get(self.chain, self.proxy)
+            futures: list[Optional[Future]] = [
+                tracker.track(tx_hash, label) if tx_hash else None for tx_hash, label in zip(tx_hashes, labels)
+            ]
+            results = []
+            for tx_hash, future in zip(tx_hashes, futures):
+                if future is None:
+                    results.append((None, False))
+                    continue
+                try:
+                    tx_receipt = future.result()
+                except TimeoutError:
+                    results.append((tx_hash.hex(), None))
+                    continue
+                results.append((tx_hash.hex(), tx_receipt['status'] == 1))
+
+        # непринятые и не дождавшиеся квитанции транзакции могли оставить дыру в nonce,
+        # следующий запрос nonce возьмем из сети
+        failed_addresses = {account.address for (account, _), (tx_hash, status) in zip(items, results)
+                            if tx_hash is None or (wait and status is None)}
+        for address in failed_addresses:
+            NonceManager.reset(self.chain, address)
+        return results
+
+if __name__ == '__main__':
+    pass
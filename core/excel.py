@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import atexit
+import functools
+import threading
+import time
 from typing import Optional
 from datetime import datetime
 
@@ -12,21 +16,222 @@ from config import config
 from models.account import Account
 
 
+class SharedWorkbook:
+    """
+    Книга excel, загруженная один раз на процесс. Все объекты Excel одного файла работают с ней.
+    Изменения копятся в памяти и сохраняются в файл раз в config.excel_flush_interval секунд
+    или после config.excel_flush_threshold изменений, фоновый поток сохраняет изменения, после которых
+    записей больше не было. Книга перечитывается, только если файл изменили извне.
+    """
+
+    _workbooks: dict[str, SharedWorkbook] = {}
+    _lock = threading.RLock()
+    _flusher: Optional[threading.Thread] = None
+
+    def __init__(self, file: str) -> None:
+        self.file = file
+        self.table: Optional[Workbook] = None
+        self.mtime: Optional[float] = None
+        # номер профиля -> строка и заголовок -> столбец, чтобы не просматривать лист при каждом обращении
+        self.rows: dict[str, int] = {}
+        self.columns: dict[str | int | float, int] = {}
+        self.changes = 0
+        self.flushed_at = time.monotonic()
+        self.load()
+
+    @classmethod
+    def get(cls, file: str) -> SharedWorkbook:
+        """
+        Возвращает книгу файла, при первом обращении загружает ее.
+        :param file: полный путь к файлу
+        :return: книга
+        """
+
+        with cls._lock:
+            workbook = cls._workbooks.get(file)
+            if workbook is None:
+                workbook = cls(file)
+                cls._workbooks[file] = workbook
+            else:
+                workbook.reload_if_changed()
+            return workbook
+
+    def _get_mtime(self) -> Optional[float]:
+
+        return os.path.getmtime(self.file) if os.path.exists(self.file) else None
+
+    def load(self) -> None:
+
+        if not os.path.exists(self.file):  # Если файл не существует, создаем его
+            self.table = self._create_excel()
+        else:
+            self.table = load_workbook(self.file)
+        self._build_indexes()
+        self.mtime = self._get_mtime()
+        self.changes = 0
+        self.flushed_at = time.monotonic()
+
+    def _build_indexes(self) -> None:
+
+        sheet = self.table.active
+        self.rows = {}
+        for row, (value,) in enumerate(sheet.iter_rows(min_row=2, max_col=1, values_only=True), start=2):
+            if value is not None:
+                # при повторах, как и при просмотре столбца, берется первая строка
+                self.rows.setdefault(str(value), row)
+        self.columns = {}
+        for column, value in enumerate(next(sheet.iter_rows(max_row=1, values_only=True), ()), start=1):
+            if value is not None:
+                self.columns.setdefault(value, column)
+
+    def reload_if_changed(self) -> None:
+
+        if self._get_mtime() == self.mtime:
+            return
+        if self.changes:
+            logger.warning(f'Файл {self.file} изменен извне, но в памяти есть несохраненные изменения, '
+                           f'файл будет перезаписан')
+            return
+        logger.info(f'Файл {self.file} изменен извне, загружаем заново')
+        self.load()
+
+    def _create_excel(self) -> Workbook:
+
+        table = Workbook()  # Создаем новую таблицу
+        table.active['A1'] = 'Profile Number'  # Заполняем ячейки
+        if self.file == config.PATH_EXCEL:
+            table.active['B1'] = 'Address'  # Заполняем ячейки
+            table.active['C1'] = 'Password'  # Заполняем ячейки
+            table.active['D1'] = 'Seed'  # Заполняем ячейки
+            table.active['E1'] = 'Private Key'  # Заполняем ячейки
+            table.active['F1'] = 'Proxy'  # Заполняем ячейки
+        table.save(self.file)  # Сохраняем таблицу
+        return table
+
+    def save(self) -> None:
+
+        with self._lock:
+            self.changes += 1
+            is_interval_passed = time.monotonic() - self.flushed_at >= config.excel_flush_interval
+            if self.changes >= config.excel_flush_threshold or is_interval_passed:
+                self.flush()
+            else:
+                self._start_flusher()
+
+    @classmethod
+    def _start_flusher(cls) -> None:
+
+        with cls._lock:
+            if cls._flusher is None or not cls._flusher.is_alive():
+                cls._flusher = threading.Thread(target=cls._flush_loop, name='excel-flush', daemon=True)
+                cls._flusher.start()
+
+    @classmethod
+    def _flush_loop(cls) -> None:
+
+        # без него изменения лежали бы в памяти до следующей записи, а при убийстве процесса терялись
+        while True:
+            time.sleep(1)
+            with cls._lock:
+                workbooks = [workbook for workbook in cls._workbooks.values() if workbook.changes]
+                if not workbooks:
+                    cls._flusher = None
+                    return
+                for workbook in workbooks:
+                    if time.monotonic() - workbook.flushed_at >= config.excel_flush_interval:
+                        workbook.flush()
+
+    def flush(self) -> None:
+        """
+        Сохраняет накопленные изменения в файл.
+        """
+
+        with self._lock:
+            if self.changes:
+                self.table.save(self.file)
+                # свое сохранение не считается внешним изменением
+                self.mtime = self._get_mtime()
+            self.changes = 0
+            self.flushed_at = time.monotonic()
+
+    @classmethod
+    def flush_all(cls, file: Optional[str] = None) -> None:
+        """
+        Сохраняет изменения всех книг или только книги одного файла.
+        :param file: полный путь к файлу, если не указан - все книги
+        """
+
+        with cls._lock:
+            for workbook in list(cls._workbooks.values()):
+                if file is None or workbook.file == file:
+                    workbook.flush()
+
+
+def _locked(method):
+
+    # фоновое сохранение не должно записывать книгу посреди ее изменения
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with SharedWorkbook._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class Excel:
+    """
+    Работа с таблицей excel. Объект - легкое представление общей книги файла (SharedWorkbook),
+    привязанное к строке аккаунта. Изменения сохраняются с задержкой, при выходе из with
+    и при завершении программы. Чтения сразу видят несохраненные изменения.
+    """
 
     def __init__(self, account: Optional[Account] = None, file: Optional[str] = None) -> None:
 
         self.account = account
         self._file = self._get_file(file)
-        self._table = self._get_table()
-        self._sheet: Worksheet = self._table.active
+        self._workbook = SharedWorkbook.get(self._file)
         if account:
             self.acc_row = self._find_acc_row(str(self.account.profile_number))
 
+    def __enter__(self) -> Excel:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.flush()
+
+    @property
+    def _table(self) -> Workbook:
+        return self._workbook.table
+
+    @property
+    def _sheet(self) -> Worksheet:
+        return self._workbook.table.active
+
+    def _save(self) -> None:
+
+        self._workbook.save()
+
+    def flush(self) -> None:
+        """
+        Сохраняет накопленные изменения файла в него.
+        """
+
+        self._workbook.flush()
+
+    @classmethod
+    def flush_all(cls, file: Optional[str] = None) -> None:
+        """
+        Сохраняет изменения всех таблиц или только таблицы одного файла.
+        :param file: полный путь к файлу, если не указан - все таблицы
+        """
+
+        SharedWorkbook.flush_all(file)
+
     def change_table(self, table_name: str) -> None:
 
+        self.flush()
         self._file = os.path.join(config.PATH_DATA, table_name)
-        self._table = self._get_table()
+        self._workbook = SharedWorkbook.get(self._file)
 
     def connect_account(self, account: Account) -> None:
 
@@ -41,63 +246,50 @@ class Excel:
         file = os.path.join(config.PATH_DATA, file)
         return file
 
-    def _get_table(self) -> Workbook:
-
-        if not os.path.exists(self._file):  # Если файл не существует, создаем его
-            table = self._create_excel()
-        else:
-            table = load_workbook(self._file)
-        return table
-
-    def _create_excel(self) -> Workbook:
-
-        table = Workbook()  # Создаем новую таблицу
-        table.active['A1'] = 'Profile Number'  # Заполняем ячейки
-        if self._file == config.PATH_EXCEL:
-            table.active['B1'] = 'Address'  # Заполняем ячейки
-            table.active['C1'] = 'Password'  # Заполняем ячейки
-            table.active['D1'] = 'Seed'  # Заполняем ячейки
-            table.active['E1'] = 'Private Key'  # Заполняем ячейки
-            table.active['F1'] = 'Proxy'  # Заполняем ячейки
-        table.save(self._file)  # Сохраняем таблицу
-        return table
 
+    @_locked
     def _find_acc_row(self, profile_number: str) -> int:
 
-        for row in self._sheet.iter_rows(min_row=2, max_col=1):
-            if str(row[0].value) == profile_number:
-                return row[0].row
+        row = self._workbook.rows.get(profile_number)
+        if row:
+            return row
         add_row = self._sheet.max_row + 1
         self._sheet.cell(row=add_row, column=1, value=profile_number)
-        self._table.save(self._file)
+        self._workbook.rows[profile_number] = add_row
+        self._save()
         return add_row
 
+    @_locked
     def add_row(self, values: list) -> None:
 
         self._sheet.append(values)
-        self._table.save(self._file)
+        if values and values[0] is not None:
+            self._workbook.rows.setdefault(str(values[0]), self._sheet.max_row)
+        self._save()
 
+    @_locked
     def set_cell(self, column_name: str, value: str | int | float, row: Optional[int] = None) -> None:
 
         row = self.acc_row if not row else row
 
         col_num = self.find_column(column_name)
         self._sheet.cell(row=row, column=col_num, value=value)
-        self._table.save(self._file)
+        self._save()
 
+    @_locked
     def add_column(self, column_name: str) -> int:
 
         col_num = self._sheet.max_column + 1
         self._sheet.cell(row=1, column=col_num, value=column_name)
-        self._table.save(self._file)
+        self._workbook.columns[column_name] = col_num
+        self._save()
         return col_num
 
     def find_column(self, column_name: str) -> int:
 
-        for row in self._sheet.iter_rows(max_row=1):
-            for cell in row:
-                if cell.value == column_name:
-                    return cell.column
+        col_num = self._workbook.columns.get(column_name)
+        if col_num:
+            return col_num
         logger.warning(f'{self.account.profile_number} Столбец {column_name} не найден, создаем новый.')
         return self.add_column(column_name)
 
@@ -132,6 +324,7 @@ class Excel:
 
         return row_values
 
+    @_locked
     def get_counter(self, column_name: str, row: Optional[int] = None) -> int | float:
 
         row = self.acc_row if not row else row
@@ -141,19 +334,20 @@ class Excel:
 
         if cell.value is None:
             cell.value = 0
-            self._table.save(self._file)
+            self._save()
         elif isinstance(cell.value, str):
             if cell.value.isdigit():
                 cell.value = int(cell.value)
-                self._table.save(self._file)
+                self._save()
             elif cell.value.replace('.', '', 1).isdigit():
                 cell.value = float(cell.value)
-                self._table.save(self._file)
+                self._save()
             else:
                 raise TypeError(f'Значение в столбце {column_name} не является числом')
 
         return cell.value
 
+    @_locked
     def increase_counter(self, column_name: str, number: int = 1, row: Optional[int] = None) -> int:
 
         row = self.acc_row if not row else row
@@ -170,9 +364,10 @@ class Excel:
                 raise TypeError(f'Значение в столбце {column_name} не является числом')
 
         cell.value += number
-        self._table.save(self._file)
+        self._save()
         return cell.value
 
+    @_locked
     def set_date(self, column_name: str, row: Optional[int] = None) -> None:
 
         row = self.acc_row if not row else row
@@ -180,7 +375,7 @@ class Excel:
         col_num = self.find_column(column_name)
 
         self._sheet.cell(row=row, column=col_num, value=datetime.now().strftime(config.date_format))
-        self._table.save(self._file)
+        self._save()
 
     def get_date(self, column_name: str, row: Optional[int] = None) -> datetime:
 
@@ -196,6 +391,7 @@ class Excel:
             f'{self.account.profile_number} Не нашли дату в столбце {column_name} возвращаем старую дату')
         return datetime.now().replace(year=2000)
 
+    @_locked
     def get_counters(self, column_name: str) -> list[int | float]:
 
         col_num = self.find_column(column_name)
@@ -211,5 +407,9 @@ class Excel:
                         cell.value = float(cell.value)
 
                 column_values.append(cell.value)
-        self._table.save(self._file)
+        self._save()
         return column_values
+
+
+# несохраненные изменения записываются при завершении программы
+atexit.register(SharedWorkbook.flush_all)
@@ -18,6 +18,7 @@ from models.account import Account
 from models.amount import Amount
 from models.chain import Chain
 from models.token import Token
+from utils import codec
 from utils.utils import random_sleep, prepare_proxy_requests
 
 
@@ -56,9 +57,9 @@ class Binance(AbsExchange):
         response = requests.get(url, headers=self._headers, params=params, proxies=self._proxies)
         try:
             response.raise_for_status()
-            response_json = response.json()
+            response_json = codec.loads(response.content)
             return response_json
-        except RequestException as error:
+        except (RequestException, json.JSONDecodeError) as error:
             logger.error(f'{self.account.profile_number} Ошибка запроса к бирже Binance: {error}, {response.text}')
             raise error
 
@@ -73,9 +74,9 @@ class Binance(AbsExchange):
         response = requests.post(url, params=params, headers=self._headers, proxies=self._proxies)
         try:
             response.raise_for_status()
-            response_json = response.json()
+            response_json = codec.loads(response.content)
             return response_json
-        except RequestException as error:
+        except (RequestException, json.JSONDecodeError) as error:
             logger.error(f'{self.account.profile_number} Ошибка запроса к бирже Binance: {error}, {response.text}')
             raise error
 
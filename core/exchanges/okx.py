@@ -18,6 +18,7 @@ from models.account import Account
 from models.amount import Amount
 from models.chain import Chain
 from models.token import Token
+from utils import codec
 from utils.utils import random_sleep, prepare_proxy_requests
 
 
@@ -31,9 +32,9 @@ class Okx(AbsExchange):
         self._endpoint = 'https://www.okx.com'
         self._proxies = prepare_proxy_requests(config.okx_proxy)
 
-    def _get_headers(self, method: str, request_path: str, body: dict | None = None) -> dict:
+    def _get_headers(self, method: str, request_path: str, body: str = '') -> dict:
 
-        body = json.dumps(body) if body else ''
+        # body - ровно та строка, которая уйдет в запросе, иначе подпись не совпадет
         # подготовка данных для подписи
         date = datetime.now(UTC)
         ms = str(date.microsecond).zfill(6)[:3]
@@ -64,7 +65,7 @@ class Okx(AbsExchange):
         headers = self._get_headers('GET', path)
         response = requests.get(url, headers=headers, proxies=self._proxies)
         response.raise_for_status()
-        response_json = response.json()
+        response_json = codec.loads(response.content)
         if response_json.get('code') != '0':
             raise HTTPError('status =! 0 ' + response_json.get('msg'))
         return response_json
@@ -72,10 +73,11 @@ class Okx(AbsExchange):
     def _post_request(self, path: str, body: dict | None = None) -> dict:
 
         url = self._endpoint + path
+        body = codec.dumps(body).decode() if body else ''
         headers = self._get_headers('POST', path, body)
-        response = requests.post(url, headers=headers, json=body, proxies=self._proxies)
+        response = requests.post(url, headers=headers, data=body.encode(), proxies=self._proxies)
         response.raise_for_status()
-        response_json = response.json()
+        response_json = codec.loads(response.content)
         if response_json.get('code') != '0':
             raise HTTPError('status =! 0 ' + response_json.get('msg'))
         return response_json
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional, TYPE_CHECKING
+
+from models.chain import Chain
+
+if TYPE_CHECKING:
+    from core.onchain import Onchain
+
+
+class Fees:
+    """
+    Параметры комиссии сети на момент блока block_number, без множителей Onchain
+    """
+
+    def __init__(self, block_number: int, gas_price: int, base_fee: int = 0, priority_fee: int = 0) -> None:
+        self.block_number = block_number
+        self.gas_price = gas_price
+        self.base_fee = base_fee
+        self.priority_fee = priority_fee
+
+
+class FeeOracle:
+    """
+    Общий для всех Onchain и потоков кэш комиссии сети.
+    fee_history и gas_price запрашиваются не чаще одного раза за блок,
+    время жизни кэша равно времени блока сети.
+    """
+
+    _oracles: dict[str, FeeOracle] = {}
+    _oracles_lock = threading.Lock()
+
+    def __init__(self, chain: Chain) -> None:
+        self.chain = chain
+        self._lock = threading.Lock()
+        self._fees: Optional[Fees] = None
+        self._expires_at = 0.0
+
+    @classmethod
+    def get(cls, chain: Chain) -> FeeOracle:
+
+        with cls._oracles_lock:
+            oracle = cls._oracles.get(chain.name)
+            if oracle is None:
+                oracle = cls(chain)
+                cls._oracles[chain.name] = oracle
+            return oracle
+
+    @property
+    def _ttl(self) -> float:
+
+        # для сетей с очень быстрыми блоками не обновляем чаще раза в секунду
+        return max(self.chain.block_time, 1.0)
+
+    def is_expired(self) -> bool:
+
+        return self._fees is None or time.monotonic() >= self._expires_at
+
+    def get_fees(self, onchain: Onchain) -> Fees:
+
+        # пока один поток обновляет кэш, остальные ждут и получают уже свежие данные
+        with self._lock:
+            if self.is_expired():
+                with onchain.batch() as batch:
+                    batch.fee_history(20, 'latest', [40])
+                    batch.gas_price()
+                    fee_history, gas_price = batch.execute()
+                self._set_fees(fee_history, gas_price)
+            return self._fees
+
+    def update(self, fee_history: dict, gas_price: int) -> Fees:
+        """
+        Обновляет кэш данными, полученными в чужом batch запросе (см. Onchain.prepare).
+        """
+
+        with self._lock:
+            self._set_fees(fee_history, gas_price)
+            return self._fees
+
+    def _set_fees(self, fee_history: dict, gas_price: int) -> None:
+
+        self._fees = self._parse_fees(fee_history, gas_price)
+        self._expires_at = time.monotonic() + self._ttl
+
+    def _parse_fees(self, fee_history: dict, gas_price: int) -> Fees:
+
+        base_fees = fee_history.get('baseFeePerGas', [0])
+        if self.chain.is_eip1559 is None:
+            self.chain.is_eip1559 = any(base_fees)
+
+        rewards = fee_history.get('reward', [[0]])
+        block_number = fee_history.get('oldestBlock', 0) + len(rewards) - 1
+        if self.chain.is_eip1559 is False:
+            return Fees(block_number, gas_price)
+
+        # медиана 40-го перцентиля чаевых за последние 20 блоков, нулевые не учитываем
+        priority_fees = sorted(fee[0] for fee in rewards if fee[0] != 0) or [0]
+        median_priority_fee = priority_fees[len(priority_fees) // 2]
+
+        return Fees(block_number, gas_price, base_fees[-1], median_priority_fee)
+
+
+if __name__ == '__main__':
+    pass
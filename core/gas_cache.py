@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3 import Web3
+
+from models.chain import Chain
+from utils.utils import get_multiplayer
+
+# transfer, transferFrom и approve ERC20: запись в пустой слот (новый получатель или spender) стоит
+# на ~17 000 газа дороже, чем в занятый, выученный лимит может не покрыть такую транзакцию
+STATE_DEPENDENT_SELECTORS = {'0xa9059cbb', '0x23b872dd', '0x095ea7b3'}
+
+
+class GasCache:
+    """
+    Лимиты газа, выученные по квитанциям отправленных транзакций.
+    Ключ - (chain_id, адрес получателя, селектор функции), для операций с токеном
+    получатель и есть адрес токена. Хранится максимальный gasUsed, к нему добавляется запас.
+    Переводы и approve ERC20 не кэшируются, их газ всегда оценивается.
+    Лимит из кэша заменяет только eth_estimateGas, Onchain все равно проверяет транзакцию через eth_call,
+    чтобы откат обнаружился до отправки.
+    """
+
+    _gas_used: dict[tuple[int, str, str], int] = {}
+    _eoa: dict[tuple[int, str], bool] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(chain: Chain, tx: dict) -> tuple[int, str, str]:
+
+        data = tx.get('data') or '0x'
+        if isinstance(data, bytes):
+            data = HexBytes(data).to_0x_hex()
+        return chain.chain_id, str(tx.get('to', '')), data[:10]
+
+    @staticmethod
+    def is_plain_transfer(tx: dict) -> bool:
+
+        return tx.get('data') in (None, '0x', b'')
+
+    @classmethod
+    def get(cls, chain: Chain, tx: dict) -> Optional[int]:
+
+        key = cls._key(chain, tx)
+        if key[2] in STATE_DEPENDENT_SELECTORS:
+            return None
+        with cls._lock:
+            gas_used = cls._gas_used.get(key)
+        if gas_used is None:
+            return None
+        # расход газа зависит от состояния (например первый перевод на пустой адрес дороже), берем запас
+        return int(gas_used * get_multiplayer(1.2, 1.3))
+
+    @classmethod
+    def learn(cls, chain: Chain, tx: dict, gas_used: int) -> None:
+
+        key = cls._key(chain, tx)
+        if key[2] in STATE_DEPENDENT_SELECTORS:
+            return
+        with cls._lock:
+            cls._gas_used[key] = max(gas_used, cls._gas_used.get(key, 0))
+
+    @classmethod
+    def get_is_eoa(cls, chain: Chain, address: ChecksumAddress) -> Optional[bool]:
+
+        with cls._lock:
+            return cls._eoa.get((chain.chain_id, address))
+
+    @classmethod
+    def set_code(cls, chain: Chain, address: ChecksumAddress, code: bytes) -> bool:
+
+        is_eoa = len(code) == 0
+        with cls._lock:
+            cls._eoa[(chain.chain_id, address)] = is_eoa
+        return is_eoa
+
+    @classmethod
+    def is_eoa(cls, w3: Web3, chain: Chain, address: ChecksumAddress) -> bool:
+
+        is_eoa = cls.get_is_eoa(chain, address)
+        if is_eoa is None:
+            is_eoa = cls.set_code(chain, address, w3.eth.get_code(address))
+        return is_eoa
+
+
+if __name__ == '__main__':
+    pass
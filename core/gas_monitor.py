@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+
+from config import config
+from core.provider import ProviderRegistry
+from models.chain import Chain
+
+
+class GasMonitor:
+    """
+    Общий на процесс монитор цены газа одной сети для gas_price_wait.
+    Следит за новыми блоками через подписку newHeads, если у сети указан ws,
+    иначе один поток опрашивает rpc раз в блок. Все ожидающие потоки
+    просыпаются через Condition, как только цена опустится ниже их лимита.
+    Поток работает, только пока есть ожидающие.
+    """
+
+    _monitors: dict[str, GasMonitor] = {}
+    _monitors_lock = threading.Lock()
+
+    def __init__(self, chain: Chain, proxy: Optional[str] = None) -> None:
+        self.chain = chain
+        self.w3 = ProviderRegistry.get_web3(chain, proxy)
+        self.gas_price: Optional[float] = None
+        self.block_number = 0
+        self._updated_at = 0.0
+        self._condition = threading.Condition()
+        self._waiters = 0
+        self._thread: Optional[threading.Thread] = None
+        self._is_ws_failed = False
+
+    @classmethod
+    def get(cls, chain: Chain, proxy: Optional[str] = None) -> GasMonitor:
+
+        # цена газа не зависит от аккаунта, поэтому монитор один на сеть
+        with cls._monitors_lock:
+            monitor = cls._monitors.get(chain.name)
+            if monitor is None:
+                monitor = cls(chain, proxy)
+                cls._monitors[chain.name] = monitor
+            return monitor
+
+    @staticmethod
+    def get_limit(chain: Chain) -> float:
+
+        return config.gas_price_limits.get(chain.name, config.gas_price_limit)
+
+    def wait_below(self, gas_limit: float) -> float:
+        """
+        Блокирует поток, пока цена газа в сети выше лимита.
+        :param gas_limit: лимит в gwei
+        :return: цена газа в gwei, при которой ожидание закончилось
+        """
+
+        with self._condition:
+            self._waiters += 1
+            try:
+                while True:
+                    self._start()
+                    if self.gas_price is not None and self.gas_price <= gas_limit:
+                        return self.gas_price
+                    # таймаут на случай, если поток монитора упал и его нужно перезапустить
+                    self._condition.wait(timeout=60)
+            finally:
+                self._waiters -= 1
+
+    def _start(self) -> None:
+
+        if self._thread is None or not self._thread.is_alive():
+            # пока монитор стоял, цена могла устареть
+            self.gas_price = None
+            self._thread = threading.Thread(target=self._run, name=f'gas-{self.chain.name}', daemon=True)
+            self._thread.start()
+
+    def _has_waiters(self) -> bool:
+
+        with self._condition:
+            if self._waiters:
+                return True
+            self._thread = None
+            return False
+
+    def _run(self) -> None:
+
+        while self._has_waiters():
+            try:
+                if self.chain.ws and not self._is_ws_failed:
+                    self._follow_new_heads()
+                else:
+                    self._poll()
+            except Exception as error:
+                if self.chain.ws and not self._is_ws_failed:
+                    logger.warning(f'{self.chain.name} Подписка на блоки недоступна: {error}, переходим на опрос rpc')
+                    self._is_ws_failed = True
+                else:
+                    logger.warning(f'{self.chain.name} Ошибка получения цены газа: {error}')
+                    self._sleep()
+
+    def _sleep(self) -> None:
+
+        with self._condition:
+            self._condition.wait(timeout=max(self.chain.block_time, 1.0))
+
+    def _poll(self) -> None:
+
+        while self._has_waiters():
+            self._update(self.w3.eth.block_number)
+            self._sleep()
+
+    def _follow_new_heads(self) -> None:
+
+        from websockets.sync.client import connect
+
+        with connect(self.chain.ws, open_timeout=config.rpc_timeout) as websocket:
+            websocket.send(json.dumps(
+                {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newHeads']}
+            ))
+            while self._has_waiters():
+                try:
+                    message = json.loads(websocket.recv(timeout=max(self.chain.block_time * 5, 30)))
+                except TimeoutError:
+                    continue
+                head = message.get('params', {}).get('result')
+                if head:
+                    self._update(int(head['number'], 16))
+
+    def _update(self, block_number: int) -> None:
+
+        # в сетях с быстрыми блоками не запрашиваем цену чаще раза в секунду
+        if self.gas_price is not None and (
+                block_number <= self.block_number or time.monotonic() - self._updated_at < 1.0
+        ):
+            return
+        gas_price = self.w3.eth.gas_price / 10 ** 9
+        with self._condition:
+            self.block_number = block_number
+            self._updated_at = time.monotonic()
+            self.gas_price = gas_price
+            self._condition.notify_all()
+
+
+if __name__ == '__main__':
+    pass
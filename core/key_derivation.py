@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from eth_account import Account as EthAccount
+from eth_typing import ChecksumAddress
+from loguru import logger
+
+from config import config
+from models.account import Account
+
+
+def derive_key(seed: str, index: int = 0) -> tuple[str, ChecksumAddress]:
+    """
+    Выводит приватный ключ и адрес из сид фразы по пути m/44'/60'/0'/0/index.
+    Функция уровня модуля, чтобы ее можно было выполнить в дочернем процессе.
+    :param seed: сид фраза
+    :param index: номер адреса в кошельке
+    :return: (приватный ключ, адрес)
+    """
+
+    EthAccount.enable_unaudited_hdwallet_features()
+    eth_account = EthAccount.from_mnemonic(seed, account_path=f"m/44'/60'/0'/0/{index}")
+    return eth_account.key.hex(), eth_account.address
+
+
+def try_derive_key(seed: str, index: int = 0) -> Optional[tuple[str, ChecksumAddress]]:
+
+    try:
+        return derive_key(seed, index)
+    except Exception:
+        return None
+
+
+def try_derive_address(private_key: str) -> Optional[ChecksumAddress]:
+
+    try:
+        return EthAccount.from_key(private_key).address
+    except Exception:
+        return None
+
+
+class KeyDerivation:
+    """
+    Кэш ключей и адресов, выведенных из сид фраз и приватных ключей, на время работы процесса.
+    Ключ кэша - отпечаток sha256, сами сид фразы и ключи ключами словаря не хранятся.
+    Большие списки обрабатываются в пуле процессов.
+    """
+
+    _keys: dict[str, tuple[str, ChecksumAddress]] = {}
+    _addresses: dict[str, ChecksumAddress] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(*parts: str | int) -> str:
+
+        return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+    @staticmethod
+    def _map(function, *args: list) -> list:
+
+        # дочерние процессы окупаются только на больших списках
+        if len(args[0]) < config.derive_parallel_threshold:
+            return list(map(function, *args))
+
+        workers = config.process_workers or os.cpu_count() or 1
+        chunksize = max(1, len(args[0]) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(function, *args, chunksize=chunksize))
+
+    @classmethod
+    def get_key(cls, seed: str | list, index: int = 0) -> tuple[str, ChecksumAddress]:
+
+        if isinstance(seed, list):
+            seed = ' '.join(seed)
+        fingerprint = cls._fingerprint(seed, index)
+        with cls._lock:
+            cached = cls._keys.get(fingerprint)
+        if cached:
+            return cached
+
+        private_key, address = derive_key(seed, index)
+        with cls._lock:
+            cls._keys[fingerprint] = private_key, address
+        return private_key, address
+
+    @classmethod
+    def get_address(cls, private_key: str) -> ChecksumAddress:
+
+        fingerprint = cls._fingerprint(private_key)
+        with cls._lock:
+            address = cls._addresses.get(fingerprint)
+        if address:
+            return address
+
+        address = EthAccount.from_key(private_key).address
+        with cls._lock:
+            cls._addresses[fingerprint] = address
+        return address
+
+    @classmethod
+    def get_keys(cls, seeds: list[str],
+                 indices: Iterable[int] = (0,)) -> list[list[Optional[tuple[str, ChecksumAddress]]]]:
+        """
+        Выводит ключи и адреса для многих сид фраз сразу, недостающие в кэше считаются параллельно.
+        :param seeds: сид фразы
+        :param indices: номера адресов, которые нужно вывести из каждой сид фразы
+        :return: для каждой сид фразы список (приватный ключ, адрес) по каждому номеру, None для невалидной фразы
+        """
+
+        indices = list(indices)
+        pairs = [(seed, index) for seed in seeds for index in indices]
+        with cls._lock:
+            missing = [(seed, index) for seed, index in dict.fromkeys(pairs)
+                       if cls._fingerprint(seed, index) not in cls._keys]
+
+        if missing:
+            results = cls._map(try_derive_key, [seed for seed, _ in missing], [index for _, index in missing])
+            with cls._lock:
+                for (seed, index), result in zip(missing, results):
+                    if result:
+                        cls._keys[cls._fingerprint(seed, index)] = result
+
+        with cls._lock:
+            keys = [cls._keys.get(cls._fingerprint(seed, index)) for seed, index in pairs]
+        return [keys[start:start + len(indices)] for start in range(0, len(keys), len(indices))]
+
+    @classmethod
+    def fill_accounts(cls, accounts: list[Account]) -> None:
+        """
+        Заполняет приватные ключи аккаунтов с одной сид фразой и адреса аккаунтов с приватным ключом.
+        Невалидные сид фразы и ключи пропускаются с предупреждением.
+        :param accounts: аккаунты
+        """
+
+        seed_accounts = [account for account in accounts if account.seed and not account.private_key]
+        keys = cls.get_keys([account.seed for account in seed_accounts]) if seed_accounts else []
+        for account, (key,) in zip(seed_accounts, keys):
+            if key is None:
+                logger.warning(f'{account.profile_number} Некорректная сид фраза, ключ не выведен')
+                continue
+            account.private_key = key[0]
+            if not account.address:
+                account.address = key[1]
+
+        key_accounts = [account for account in accounts if account.private_key and not account.address]
+        if not key_accounts:
+            return
+        with cls._lock:
+            missing = [account.private_key for account in key_accounts
+                       if cls._fingerprint(account.private_key) not in cls._addresses]
+        missing = list(dict.fromkeys(missing))
+        if missing:
+            addresses = cls._map(try_derive_address, missing)
+            with cls._lock:
+                for private_key, address in zip(missing, addresses):
+                    if address:
+                        cls._addresses[cls._fingerprint(private_key)] = address
+
+        for account in key_accounts:
+            with cls._lock:
+                address = cls._addresses.get(cls._fingerprint(account.private_key))
+            if address:
+                account.address = address
+            else:
+                logger.warning(f'{account.profile_number} Некорректный приватный ключ, адрес не выведен')
+
+
+if __name__ == '__main__':
+    pass
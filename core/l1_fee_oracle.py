@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional, TYPE_CHECKING
+
+from hexbytes import HexBytes
+
+from models.chain import Chain
+
+if TYPE_CHECKING:
+    from core.onchain import OnchainBatch
+    from web3.contract import Contract
+
+GAS_PRICE_ORACLE_ADDRESS = '0x420000000000000000000000000000000000000F'
+
+GAS_PRICE_ORACLE_ABI = [
+    {
+        "inputs": [{"internalType": "bytes", "name": "_data", "type": "bytes"}],
+        "name": "getL1Fee",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "l1BaseFee",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "blobBaseFee",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "baseFeeScalar",
+        "outputs": [{"internalType": "uint32", "name": "", "type": "uint32"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "blobBaseFeeScalar",
+        "outputs": [{"internalType": "uint32", "name": "", "type": "uint32"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+class L1FeeOracle:
+    """
+    Кэш параметров L1 комиссии OP-stack сети из предеплоя GasPriceOracle.
+    Пока параметры свежие, L1 комиссия считается локально по размеру calldata той же формулой,
+    что и getL1Fee (Fjord), иначе getL1Fee и параметры запрашиваются в общем batch запросе.
+    """
+
+    SCALAR_FUNCTIONS = ('l1BaseFee', 'blobBaseFee', 'baseFeeScalar', 'blobBaseFeeScalar')
+
+    # константы линейной регрессии размера транзакции из GasPriceOracle
+    _cost_intercept = -42_585_600
+    _cost_fastlz_coef = 836_500
+    _min_transaction_size = 100
+    # базовая комиссия L1 меняется раз в блок Ethereum
+    _ttl = 12.0
+
+    _oracles: dict[str, L1FeeOracle] = {}
+    _oracles_lock = threading.Lock()
+
+    def __init__(self, chain: Chain) -> None:
+        self.chain = chain
+        self._lock = threading.Lock()
+        self._scalars: Optional[tuple[int, int, int, int]] = None
+        self._expires_at = 0.0
+
+    @classmethod
+    def get(cls, chain: Chain) -> L1FeeOracle:
+
+        with cls._oracles_lock:
+            oracle = cls._oracles.get(chain.name)
+            if oracle is None:
+                oracle = cls(chain)
+                cls._oracles[chain.name] = oracle
+            return oracle
+
+    def set_scalars(self, l1_base_fee: Optional[int], blob_base_fee: Optional[int],
+                    base_fee_scalar: Optional[int], blob_base_fee_scalar: Optional[int]) -> None:
+
+        scalars = (l1_base_fee, blob_base_fee, base_fee_scalar, blob_base_fee_scalar)
+        # в сетях без Ecotone части функций нет, тогда всегда спрашиваем getL1Fee
+        if any(scalar is None for scalar in scalars):
+            return
+        with self._lock:
+            self._scalars = scalars
+            self._expires_at = time.monotonic() + self._ttl
+
+    def estimate(self, data: bytes | str) -> Optional[int]:
+        """
+        Считает L1 комиссию по закэшированным параметрам.
+        Размер после сжатия FastLZ оценивается сверху размером calldata, для простых переводов оценка точная.
+        :param data: calldata транзакции
+        :return: комиссия в wei или None, если параметров нет или они устарели
+        """
+
+        with self._lock:
+            if self._scalars is None or time.monotonic() >= self._expires_at:
+                return None
+            l1_base_fee, blob_base_fee, base_fee_scalar, blob_base_fee_scalar = self._scalars
+
+        fastlz_size = len(HexBytes(data)) + 68
+        estimated_size = max(
+            self._cost_intercept + self._cost_fastlz_coef * fastlz_size,
+            self._min_transaction_size * 10 ** 6
+        )
+        fee_scaled = base_fee_scalar * 16 * l1_base_fee + blob_base_fee_scalar * blob_base_fee
+        return estimated_size * fee_scaled // 10 ** 12
+
+    def add_to_batch(self, batch: OnchainBatch, contract: Contract, data: bytes | str) -> Callable[[Iterator], int]:
+        """
+        Добавляет в batch точный getL1Fee и параметры комиссии для следующих локальных расчетов.
+        :return: функция, которая забирает результаты из итератора batch и возвращает комиссию в wei
+        """
+
+        batch.call(contract.functions.getL1Fee(data))
+        for function_name in self.SCALAR_FUNCTIONS:
+            batch.call(getattr(contract.functions, function_name)(), allow_failure=True)
+
+        def apply(results: Iterator[Any]) -> int:
+            l1_fee = next(results)
+            self.set_scalars(*(next(results) for _ in self.SCALAR_FUNCTIONS))
+            return l1_fee
+
+        return apply
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import threading
+
+from eth_typing import ChecksumAddress
+from loguru import logger
+from web3 import Web3
+
+from models.chain import Chain
+
+
+class NonceManager:
+    """
+    Локальный счетчик nonce для пары (сеть, адрес).
+    Один раз берет pending nonce из сети, дальше выдает nonce без запросов к rpc,
+    поэтому транзакции можно подписывать и отправлять подряд, не дожидаясь квитанций.
+    """
+
+    _nonces: dict[tuple[int, ChecksumAddress], int] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_nonce(cls, w3: Web3, chain: Chain, address: ChecksumAddress) -> int:
+
+        key = (chain.chain_id, address)
+        with cls._lock:
+            if key in cls._nonces:
+                nonce = cls._nonces[key]
+                cls._nonces[key] = nonce + 1
+                return nonce
+
+        pending_nonce = w3.eth.get_transaction_count(address, 'pending')
+        with cls._lock:
+            nonce = cls._nonces.setdefault(key, pending_nonce)
+            cls._nonces[key] = nonce + 1
+            return nonce
+
+    @classmethod
+    def is_seeded(cls, chain: Chain, address: ChecksumAddress) -> bool:
+
+        with cls._lock:
+            return (chain.chain_id, address) in cls._nonces
+
+    @classmethod
+    def seed(cls, chain: Chain, address: ChecksumAddress, pending_nonce: int) -> None:
+
+        # pending nonce получен заранее, например в общем batch запросе Onchain.prepare
+        with cls._lock:
+            cls._nonces.setdefault((chain.chain_id, address), pending_nonce)
+
+    @classmethod
+    def reset(cls, chain: Chain, address: ChecksumAddress) -> None:
+
+        # следующий get_nonce заново возьмет pending nonce из сети
+        with cls._lock:
+            cls._nonces.pop((chain.chain_id, address), None)
+        logger.debug(f'{chain.name} {address} nonce сброшен, синхронизируем с сетью')
+
+    @staticmethod
+    def is_nonce_error(error: Exception) -> bool:
+
+        message = str(error).lower()
+        return 'nonce too low' in message or 'nonce too high' in message
+
+
+if __name__ == '__main__':
+    pass
@@ -1,22 +1,243 @@
 from __future__ import annotations
 
 import random
-from typing import Optional
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Optional, Callable, Any, Iterator
 
-from eth_account import Account as EthAccount
 from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
 from loguru import logger
 from web3 import Web3
 from web3.contract import Contract
+from web3.contract.contract import ContractFunction
+from web3.exceptions import Web3RPCError, ContractLogicError
 
 from config import config, Tokens, Chains
+from core.fee_oracle import FeeOracle
+from core.gas_cache import GasCache
+from core.gas_monitor import GasMonitor
+from core.key_derivation import KeyDerivation
+from core.l1_fee_oracle import L1FeeOracle, GAS_PRICE_ORACLE_ABI, GAS_PRICE_ORACLE_ADDRESS
+from core.nonce_manager import NonceManager
+from core.provider import ProviderRegistry
+from core.receipt_tracker import ReceiptTracker
+from core.token_cache import TokenMetadataCache
 from models.account import Account
 from models.amount import Amount
 from models.chain import Chain
 from models.contract_raw import ContractRaw
 from models.token import Token, TokenTypes
-from utils.utils import to_checksum, random_sleep, get_multiplayer, prepare_proxy_requests, get_user_agent
+from utils.utils import to_checksum, get_multiplayer, get_user_agent
 
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "uint256", "name": "value", "type": "uint256"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3Value[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3Value",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"internalType": "uint256", "name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# верхняя оценка газа одного перевода нативного токена внутри aggregate3Value (перевод на новый адрес)
+DISPERSE_TRANSFER_GAS = 40_000
+
+
+class OnchainBatch:
+    """
+    Собирает чтения Onchain и отправляет их одним JSON-RPC batch запросом.
+    Результаты возвращаются в порядке добавления: Amount для балансов, int для nonce и газа.
+    """
+
+    def __init__(self, onchain: Onchain) -> None:
+        self._onchain = onchain
+        self._requests: list[tuple[Callable[[], Any], Callable[[Any], Any], bool]] = []
+
+    def __enter__(self) -> OnchainBatch:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._requests.clear()
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def _add(self, request: Callable[[], Any], formatter: Callable[[Any], Any] = lambda result: result,
+             allow_failure: bool = False) -> None:
+
+        self._requests.append((request, formatter, allow_failure))
+
+    def get_balance(
+            self,
+            *,
+            token: Optional[Token | str | ChecksumAddress] = None,
+            address: Optional[str | ChecksumAddress] = None
+    ) -> None:
+
+        w3 = self._onchain.w3
+        token = self._onchain._get_token(token)
+        address = to_checksum(address or self._onchain.account.address)
+
+        if token.type_token == TokenTypes.NATIVE:
+            self._add(lambda: w3.eth.get_balance(address), lambda result: Amount(result, wei=True))
+        else:
+            contract = self._onchain._get_contract(token)
+            self._add(
+                lambda: contract.functions.balanceOf(address),
+                lambda result: Amount(result, decimals=token.decimals, wei=True)
+            )
+
+    def get_transaction_count(self, address: Optional[str | ChecksumAddress] = None,
+                              block: str = 'latest') -> None:
+
+        w3 = self._onchain.w3
+        address = to_checksum(address or self._onchain.account.address)
+        self._add(lambda: w3.eth.get_transaction_count(address, block))
+
+    def fee_history(self, block_count: int = 20, newest_block: str = 'latest',
+                    reward_percentiles: Optional[list[float]] = None) -> None:
+
+        w3 = self._onchain.w3
+        self._add(lambda: w3.eth.fee_history(block_count, newest_block, reward_percentiles))
+
+    def gas_price(self) -> None:
+
+        w3 = self._onchain.w3
+        self._add(lambda: w3.eth.gas_price)
+
+    def estimate_gas(self, tx: dict, allow_failure: bool = False) -> None:
+        """
+        :param allow_failure: при ошибке оценки (например revert) вернуть None вместо исключения
+        """
+
+        w3 = self._onchain.w3
+        self._add(lambda: w3.eth.estimate_gas(tx), allow_failure=allow_failure)
+
+    def block_gas_limit(self) -> None:
+
+        w3 = self._onchain.w3
+        self._add(lambda: w3.eth.get_block('latest'), lambda block: block['gasLimit'])
+
+    def get_code(self, address: str | ChecksumAddress) -> None:
+
+        w3 = self._onchain.w3
+        address = to_checksum(address)
+        self._add(lambda: w3.eth.get_code(address))
+
+    def call(self, function: ContractFunction, formatter: Callable[[Any], Any] = lambda result: result,
+             allow_failure: bool = False) -> None:
+
+        self._add(lambda: function, formatter, allow_failure)
+
+    def execute(self) -> list:
+
+        if not self._requests:
+            return []
+
+        w3 = self._onchain.w3
+        try:
+            with w3.batch_requests() as batch:
+                for request, _, _ in self._requests:
+                    batch.add(request())
+                requests_info = list(batch._requests_info)
+            # batch.execute() падает на первом ответе с ошибкой и теряет остальные ответы,
+            # поэтому отправляем запросы через middleware сами и разбираем каждый ответ отдельно
+            request_func = w3.provider.batch_request_func(w3, w3.middleware_onion)
+            responses = request_func([rpc_request for rpc_request, _ in requests_info])
+        except Exception as error:
+            # запрос не дошел до rpc или ответ не разобран, выполняем запросы по очереди
+            logger.debug(f'{self._onchain.chain.name} batch запрос не выполнен, выполняем по очереди: {error}')
+            results = [self._execute_one(request, allow_failure) for request, _, allow_failure in self._requests]
+        else:
+            results = [self._format_response(request_info, response, allow_failure)
+                       for request_info, response, (_, _, allow_failure)
+                       in zip(requests_info, responses, self._requests)]
+
+        results = [result if result is None and allow_failure else formatter(result)
+                   for (_, formatter, allow_failure), result in zip(self._requests, results)]
+        self._requests.clear()
+        return results
+
+    def _format_response(self, request_info: tuple, response: dict, allow_failure: bool) -> Any:
+
+        # ошибка одного запроса (например revert при оценке газа) не затрагивает остальные
+        try:
+            return self._onchain.w3.manager._format_batched_response(request_info, response)
+        except Exception:
+            if allow_failure:
+                return None
+            raise
+
+    @staticmethod
+    def _execute_one(request: Callable[[], Any], allow_failure: bool) -> Any:
+
+        try:
+            result = request()
+            if isinstance(result, ContractFunction):
+                result = result.call()
+            return result
+        except Exception:
+            if allow_failure:
+                return None
+            raise
 
 class Onchain:
     def __init__(self, account: Account, chain: Chain):
@@ -26,16 +247,19 @@ class Onchain:
             'headers': {
                 'User-Agent': get_user_agent(),
                 "Content-Type": "application/json",
-            },
-            'proxies': None
+            }
         }
-        if config.is_web3_proxy:
-            request_kwargs['proxies'] = prepare_proxy_requests(self.account.proxy)
-
-        self.w3 = Web3(Web3.HTTPProvider(chain.rpc, request_kwargs=request_kwargs))
+        self.proxy = ProviderRegistry.get_proxy(self.account.proxy)
+
+        # соединения с rpc берем из общего пула, чтобы не открывать новую сессию на каждый Onchain
+        self.w3 = ProviderRegistry.get_web3(chain, self.proxy, request_kwargs)
+        # квитанции транзакций, отправленных без ожидания, см. pipeline() и config.is_fire_and_track
+        self.pending_receipts: list[Future] = []
+        self._is_pipeline = False
+        self._l1_oracle_contract: Optional[Contract] = None
         if self.account.private_key:
             if not self.account.address:
-                self.account.address = self.w3.eth.account.from_key(self.account.private_key).address
+                self.account.address = KeyDerivation.get_address(self.account.private_key)
 
     def _get_token_params(self, token_address: str | ChecksumAddress) -> tuple[str, int]:
 
@@ -44,44 +268,97 @@ class Onchain:
         if token_contract_address == Tokens.NATIVE_TOKEN.address:
             return self.chain.native_token, Tokens.NATIVE_TOKEN.decimals
 
+        token_params = TokenMetadataCache.get(self.chain, token_contract_address)
+        if token_params:
+            return token_params
+
         token_contract_raw = ContractRaw(token_contract_address, 'erc20', self.chain)
         token_contract = self._get_contract(token_contract_raw)
-        decimals = token_contract.functions.decimals().call()
-        symbol = token_contract.functions.symbol().call()
+        with self.batch() as batch:
+            batch.call(token_contract.functions.symbol())
+            batch.call(token_contract.functions.decimals())
+            symbol, decimals = batch.execute()
+        TokenMetadataCache.set(self.chain, token_contract_address, symbol, decimals)
         return symbol, decimals
 
+    def _get_token(self, token: Optional[Token | str | ChecksumAddress]) -> Token:
+
+        if token is None:
+            return Tokens.NATIVE_TOKEN
+
+        # если передан адрес контракта, то получаем параметры токена и создаем объект Token
+        if isinstance(token, str):
+            if to_checksum(token) == Tokens.NATIVE_TOKEN.address:
+                return Tokens.NATIVE_TOKEN
+            symbol, decimals = self._get_token_params(token)
+            return Token(symbol, token, self.chain, decimals)
+
+        return token
+
+    def batch(self) -> OnchainBatch:
+
+        return OnchainBatch(self)
+
     def _get_contract(self, contract_raw: ContractRaw) -> Contract:
 
         return self.w3.eth.contract(contract_raw.address, abi=contract_raw.abi)
 
     def _estimate_gas(self, tx: dict) -> None:
 
+        # простой перевод нативного токена на кошелек стоит фиксированный газ
+        if GasCache.is_plain_transfer(tx) and self.chain.native_transfer_gas:
+            if tx['to'] == self.account.address or GasCache.is_eoa(self.w3, self.chain, tx['to']):
+                tx['gas'] = self.chain.native_transfer_gas
+                return
+
+        try:
+            self._fill_gas(tx)
+        except (ValueError, Web3RPCError, ContractLogicError) as error:
+            # транзакция может зависеть от еще не подтвержденных (swap после approve в pipeline),
+            # тогда дожидаемся их и оцениваем газ по новому состоянию сети
+            if not self.pending_receipts:
+                raise error
+            logger.info(f'{self.account.profile_number} Оценка газа не прошла, ждем отправленные транзакции')
+            self.wait_pending()
+            self._fill_gas(tx)
+
+    def _fill_gas(self, tx: dict) -> None:
+
+        gas = GasCache.get(self.chain, tx)
+        if gas:
+            # лимит уже известен, но откат проверяем до отправки: eth_call дешевле подбора лимита в eth_estimateGas
+            try:
+                self.w3.eth.call({**tx, 'gas': gas})
+                tx['gas'] = gas
+                return
+            except (ValueError, Web3RPCError, ContractLogicError) as error:
+                # откат или нехватка выученного лимита, причину покажет оценка газа
+                logger.debug(f'{self.account.profile_number} Проверка транзакции с лимитом из кэша не прошла: {error}')
+
         tx['gas'] = int(self.w3.eth.estimate_gas(tx) * get_multiplayer())
 
+    def _build_contract_tx(self, contract: Contract, function_name: str, args: list, tx_params: dict) -> dict:
+
+        # собираем транзакцию без build_transaction, чтобы web3 не оценивал газ второй раз
+        tx_params['to'] = contract.address
+        tx_params['data'] = contract.encode_abi(function_name, args=args)
+        tx_params.setdefault('value', 0)
+        return tx_params
+
     def _get_fee(self, tx_params: dict[str, str | int] | None = None) -> dict[str, str | int]:
 
         if tx_params is None:
             tx_params = {}
 
-        fee_history = None
-
-        if self.chain.is_eip1559 is None:
-            fee_history = self.w3.eth.fee_history(20, 'latest', [40])
-            self.chain.is_eip1559 = any(fee_history.get('baseFeePerGas', [0]))
+        # комиссия сети общая для всех аккаунтов в пределах блока, берем ее из кэша
+        fees = FeeOracle.get(self.chain).get_fees(self)
 
         if self.chain.is_eip1559 is False:
-            tx_params['gasPrice'] = int(self.w3.eth.gas_price * get_multiplayer())
+            tx_params['gasPrice'] = int(fees.gas_price * get_multiplayer())
             return tx_params
 
-        fee_history = fee_history or self.w3.eth.fee_history(20, 'latest', [40])
-        base_fee = fee_history.get('baseFeePerGas', [0])[-1]
-        priority_fees = [fee[0] for fee in fee_history.get('reward', [[0]]) if fee[0] != 0] or [0]
-        median_index = len(priority_fees) // 2
-        priority_fees.sort()
-        median_priority_fee = priority_fees[median_index]
-
-        priority_fee = self._multiply(median_priority_fee)
-        max_fee = self._multiply(base_fee + priority_fee)
+        priority_fee = self._multiply(fees.priority_fee)
+        max_fee = self._multiply(fees.base_fee + priority_fee)
 
         tx_params['type'] = '0x2'
         tx_params['maxFeePerGas'] = max_fee
@@ -93,25 +370,37 @@ class Onchain:
 
         return int(value * get_multiplayer(min_mult, max_mult) * self.chain.multiplier)
 
-    def _get_l1_fee(self, tx_params: dict[str, str | int]) -> Amount:
+    def _get_l1_oracle_contract(self) -> Contract:
 
-        if self.chain.name != 'op':
-            return Amount(0, wei=True)
+        if self._l1_oracle_contract is None:
+            self._l1_oracle_contract = self.w3.eth.contract(
+                address=to_checksum(GAS_PRICE_ORACLE_ADDRESS), abi=GAS_PRICE_ORACLE_ABI
+            )
+        return self._l1_oracle_contract
 
-        abi = [
-            {
-                "inputs": [{"internalType": "bytes", "name": "_data", "type": "bytes"}],
-                "name": "getL1Fee",
-                "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
-        oracle_address = self.w3.to_checksum_address('0x420000000000000000000000000000000000000F')
-        contract = self.w3.eth.contract(address=oracle_address, abi=abi)
-        tx_params['data'] = tx_params.get('data', '0x')
-        l1_fee = contract.functions.getL1Fee(tx_params['data']).call()
-        return Amount(l1_fee, wei=True)
+    def _add_l1_fee_request(self, batch: OnchainBatch, tx_params: dict) -> Callable[[Iterator], Amount]:
+        """
+        Добавляет в batch запрос L1 комиссии OP-stack сети, если ее нельзя посчитать по кэшу.
+        :return: функция, которая забирает результат из итератора batch и возвращает комиссию
+        """
+
+        if not self.chain.is_op_stack:
+            return lambda results: Amount(0, wei=True)
+
+        oracle = L1FeeOracle.get(self.chain)
+        data = tx_params.get('data') or '0x'
+        l1_fee = oracle.estimate(data)
+        if l1_fee is not None:
+            return lambda results: Amount(l1_fee, wei=True)
+
+        apply = oracle.add_to_batch(batch, self._get_l1_oracle_contract(), data)
+        return lambda results: Amount(apply(results), wei=True)
+
+    def _get_l1_fee(self, tx_params: dict[str, str | int]) -> Amount:
+
+        with self.batch() as batch:
+            apply_l1_fee = self._add_l1_fee_request(batch, tx_params)
+            return apply_l1_fee(iter(batch.execute()))
 
     def _prepare_tx(self, value: Optional[Amount] = None,
                     to_address: Optional[str | ChecksumAddress] = None) -> dict:
@@ -120,8 +409,8 @@ class Onchain:
         tx_params = self._get_fee()
 
         # добавляем параметры транзакции
+        # nonce выдает NonceManager непосредственно перед подписью в _sign_and_send
         tx_params['from'] = self.account.address
-        tx_params['nonce'] = self.w3.eth.get_transaction_count(self.account.address)
         tx_params['chainId'] = self.chain.chain_id
 
         # если передана сумма перевода, то добавляем ее в транзакцию
@@ -135,13 +424,211 @@ class Onchain:
 
         return tx_params
 
+    def _add_tx_prerequisites(self, batch: OnchainBatch) -> Callable[[Iterator], None]:
+        """
+        Добавляет в batch запросы комиссии и pending nonce, если их еще нет в кэше.
+        Эти запросы добавляются последними, возвращаемая функция забирает их результаты.
+        """
+
+        oracle = FeeOracle.get(self.chain)
+        is_fee_needed = oracle.is_expired()
+        is_nonce_needed = not NonceManager.is_seeded(self.chain, self.account.address)
+        if is_fee_needed:
+            batch.fee_history(20, 'latest', [40])
+            batch.gas_price()
+        if is_nonce_needed:
+            batch.get_transaction_count(block='pending')
+
+        def apply(results: Iterator) -> None:
+            if is_fee_needed:
+                oracle.update(next(results), next(results))
+            if is_nonce_needed:
+                NonceManager.seed(self.chain, self.account.address, next(results))
+
+        return apply
+
+    def _set_gas(self, tx: dict, estimated_gas: Optional[int]) -> None:
+
+        if estimated_gas:
+            tx['gas'] = int(estimated_gas * get_multiplayer())
+        else:
+            self._estimate_gas(tx)
+
+    def prepare(
+            self,
+            to_address: str | ChecksumAddress,
+            amount: Amount | int | float | None = None,
+            token: Optional[Token | str | ChecksumAddress] = None
+    ) -> tuple[dict, Amount]:
+        """
+        Готовит перевод за один сетевой запрос: балансы, комиссия, nonce и оценка газа
+        отправляются одним batch запросом.
+        :param to_address: адрес получателя
+        :param amount: сумма, если не указана - весь баланс
+        :param token: токен или адрес контракта, по умолчанию нативный токен
+        :return: проверенная транзакция и итоговая сумма перевода, nonce выдается при отправке
+        """
+
+        token = self._get_token(token)
+        to_address = to_checksum(to_address)
+        if amount is not None and not isinstance(amount, Amount):
+            amount = Amount(amount, decimals=token.decimals)
+
+        if token.type_token == TokenTypes.NATIVE:
+            is_code_needed = bool(self.chain.native_transfer_gas) and to_address != self.account.address \
+                and GasCache.get_is_eoa(self.chain, to_address) is None
+            with self.batch() as batch:
+                batch.get_balance()
+                if is_code_needed:
+                    batch.get_code(to_address)
+                apply_native_fees = self._add_native_fee_requests(batch, {})
+                apply_prerequisites = self._add_tx_prerequisites(batch)
+                results = iter(batch.execute())
+            balance = next(results)
+            if is_code_needed:
+                GasCache.set_code(self.chain, to_address, next(results))
+            native_fees = apply_native_fees(results)
+            apply_prerequisites(results)
+
+            if amount is None:
+                amount = balance
+            tx_params = self._prepare_tx(amount, to_address)
+            self._validate_native_transfer_value(tx_params, balance, native_fees)
+            self._estimate_gas(tx_params)
+            return tx_params, Amount(tx_params['value'], wei=True)
+
+        # газ оцениваем на перевод 1 единицы токена, он не зависит от суммы и не упадет из-за баланса
+        # лимит из GasCache не подходит: перевод на новый адрес дороже перевода держателю токена
+        contract = self._get_contract(token)
+        estimate_tx = self._build_contract_tx(contract, 'transfer', [to_address, 1], {'from': self.account.address})
+        with self.batch() as batch:
+            batch.get_balance(token=token)
+            batch.get_balance()
+            batch.estimate_gas(estimate_tx, allow_failure=True)
+            apply_prerequisites = self._add_tx_prerequisites(batch)
+            results = iter(batch.execute())
+        balance, native_balance, estimated_gas = next(results), next(results), next(results)
+        apply_prerequisites(results)
+
+        if amount is None or balance.wei < amount.wei:
+            amount = balance
+        if amount.wei <= 0:
+            logger.error(
+                f'{self.account.profile_number}: Ошибка: Баланс: {amount.ether:.2f} {token.symbol}')
+            raise ValueError(f'Недостаточно средств для отправки транзакции!')
+
+        if native_balance <= 0:
+            logger.error(
+                f'{self.account.profile_number}: Ошибка: Нативный баланс недостаточный: {native_balance.ether:.5f} {self.chain.native_token}.')
+            raise ValueError(f'Недостаточно средств для отправки транзакции!')
+
+        tx_params = self._prepare_tx()
+        tx_params = self._build_contract_tx(contract, 'transfer', [to_address, amount.wei], tx_params)
+        self._set_gas(tx_params, estimated_gas)
+        return tx_params, amount
+
+    def _broadcast(self, tx: dict) -> HexBytes:
+        """
+        Подписывает транзакцию с локальным nonce и отправляет ее, при ошибке nonce повторяет один раз.
+        При любой ошибке nonce сбрасывается и синхронизируется с сетью. Если ответа rpc нет,
+        транзакция ищется в сети по хэшу подписанной транзакции.
+        :param tx: транзакция, nonce проставляется здесь
+        :return: хэш отправленной транзакции
+        """
+
+        for attempt in range(2):
+            tx['nonce'] = NonceManager.get_nonce(self.w3, self.chain, self.account.address)
+            try:
+                signed_tx = self.w3.eth.account.sign_transaction(tx, self.account.private_key)
+            except Exception as error:
+                # до сети транзакция не дошла, nonce не использован
+                tx.pop('nonce')
+                NonceManager.reset(self.chain, self.account.address)
+                raise error
+            try:
+                return self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except (ValueError, Web3RPCError) as error:
+                # транзакция не принята, выданный nonce не использован, синхронизируемся с сетью
+                NonceManager.reset(self.chain, self.account.address)
+                if attempt or not NonceManager.is_nonce_error(error):
+                    raise error
+                logger.warning(f'{self.account.profile_number} Ошибка nonce: {error}, повторяем с новым nonce')
+            except Exception as error:
+                # ответа rpc нет, транзакция могла попасть в сеть, проверяем по хэшу
+                if self._is_broadcasted(signed_tx.hash):
+                    return signed_tx.hash
+                NonceManager.reset(self.chain, self.account.address)
+                raise error
+
+    def _is_broadcasted(self, tx_hash: HexBytes) -> bool:
+
+        try:
+            self.w3.eth.get_transaction(tx_hash)
+        except Exception:
+            return False
+        logger.warning(f'{self.account.profile_number} Нет ответа на отправку, '
+                       f'но транзакция {tx_hash.to_0x_hex()} найдена в сети')
+        return True
+
+    def _learn_gas(self, tx: dict, tx_receipt: dict) -> None:
+
+        if tx_receipt['status'] == 1:
+            GasCache.learn(self.chain, tx, tx_receipt['gasUsed'])
+
+    def _track(self, tx: dict, tx_hash: HexBytes) -> Future:
+
+        # квитанцию получит фоновый ReceiptTracker
+        tracker = ReceiptTracker.get(self.chain, self.proxy)
+        future = tracker.track(tx_hash, self.account.profile_number)
+        future.add_done_callback(lambda done: done.exception() or self._learn_gas(tx, done.result()))
+        return future
+
     def _sign_and_send(self, tx: dict) -> str:
 
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account.private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        tx_hash = self._broadcast(tx)
+        if self._is_pipeline or config.is_fire_and_track:
+            self.pending_receipts.append(self._track(tx, tx_hash))
+            return tx_hash.hex()
         tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        self._learn_gas(tx, tx_receipt)
+        if tx_receipt['status'] != 1:
+            logger.error(f'{self.account.profile_number} Транзакция {tx_hash.to_0x_hex()} завершилась с ошибкой '
+                         f'в сети {self.chain.name}')
+            raise ValueError(f'Транзакция {tx_hash.to_0x_hex()} завершилась с ошибкой')
         return tx_receipt['transactionHash'].hex()
 
+    def wait_pending(self) -> list[dict]:
+        """
+        Ждет квитанции всех транзакций, отправленных без ожидания.
+        :return: квитанции подтвержденных транзакций
+        """
+
+        futures, self.pending_receipts = self.pending_receipts, []
+        receipts = []
+        for future in futures:
+            try:
+                receipts.append(future.result())
+            except TimeoutError as error:
+                logger.error(f'{self.account.profile_number} {error}')
+        return receipts
+
+    @contextmanager
+    def pipeline(self) -> Iterator[Onchain]:
+        """
+        Транзакции внутри блока подписываются и отправляются подряд с локальными nonce,
+        квитанции ждем один раз при выходе из блока.
+        Если транзакция зависит от еще не подтвержденных (например swap после approve), ее оценка газа
+        не проходит, тогда pipeline дожидается отправленных транзакций и оценивает газ заново.
+        Дождаться их явно можно через wait_pending().
+        """
+
+        self._is_pipeline = True
+        try:
+            yield self
+        finally:
+            self._is_pipeline = False
+            self.wait_pending()
+
     def get_balance(
             self,
             *,
@@ -177,15 +664,98 @@ class Onchain:
             balance = Amount(erc20_balance_wei, decimals=token.decimals, wei=True)
         return balance
 
-    def _validate_native_transfer_value(self, tx_params: dict) -> None:
+    def get_balances(
+            self,
+            accounts: list[Account | str | ChecksumAddress],
+            tokens: Optional[list[Token | str | ChecksumAddress]] = None
+    ) -> dict[ChecksumAddress, dict[ChecksumAddress, Amount]]:
+        """
+        Балансы нескольких токенов для нескольких адресов через Multicall3.
+        :param accounts: аккаунты или адреса
+        :param tokens: токены или адреса контрактов, по умолчанию нативный токен
+        :return: {адрес: {адрес токена: Amount}}
+        """
+
+        tokens = [self._get_token(token) for token in tokens or [None]]
+        addresses = [to_checksum(account.address if isinstance(account, Account) else account)
+                     for account in accounts]
+        multicall = self.w3.eth.contract(to_checksum(self.chain.multicall_address), abi=MULTICALL3_ABI)
+
+        # для нативного токена вызываем getEthBalance у самого multicall, для erc20 - balanceOf у токена
+        calls = []
+        keys = []
+        for address in addresses:
+            for token in tokens:
+                if token.type_token == TokenTypes.NATIVE:
+                    call_data = multicall.encode_abi('getEthBalance', args=[address])
+                    calls.append((multicall.address, True, call_data))
+                else:
+                    call_data = self._get_contract(token).encode_abi('balanceOf', args=[address])
+                    calls.append((token.address, True, call_data))
+                keys.append((address, token))
+
+        # чанки отправляем одним batch запросом, каждый чанк - один eth_call
+        chunk_size = config.multicall_chunk_size
+        with self.batch() as batch:
+            for start in range(0, len(calls), chunk_size):
+                batch.call(multicall.functions.aggregate3(calls[start:start + chunk_size]))
+            chunks = batch.execute()
+
+        balances = {address: {} for address in addresses}
+        results = [result for chunk in chunks for result in chunk]
+        for (address, token), (success, return_data) in zip(keys, results):
+            if success and len(return_data) >= 32:
+                balance = Amount(int.from_bytes(return_data[:32], 'big'), decimals=token.decimals, wei=True)
+            else:
+                logger.warning(f'Multicall не вернул баланс {token.symbol} для {address}, запрашиваем отдельно')
+                balance = self.get_balance(token=token, address=address)
+            balances[address][token.address] = balance
+
+        return balances
+
+    def _add_native_fee_requests(self, batch: OnchainBatch,
+                                 tx_params: dict) -> Callable[[Iterator], tuple[Amount, int]]:
+        """
+        Добавляет в batch запросы для оценки комиссии перевода нативного токена: L1 комиссию и газ.
+        :return: функция, которая забирает результаты из итератора batch и возвращает (L1 комиссия, газ)
+        """
+
+        apply_l1_fee = self._add_l1_fee_request(batch, tx_params)
+        gues_gas = self.chain.native_transfer_gas
+        if not gues_gas:
+            batch.estimate_gas({'from': self.account.address, 'to': self.account.address, 'value': 1})
+
+        def apply(results: Iterator) -> tuple[Amount, int]:
+            l1_fee = apply_l1_fee(results)
+            return l1_fee, gues_gas or next(results)
+
+        return apply
+
+    def _validate_native_transfer_value(self, tx_params: dict, balance: Optional[Amount] = None,
+                                        native_fees: Optional[tuple[Amount, int]] = None) -> None:
+        """
+        Проверяет, что на балансе хватает на перевод и комиссию, иначе уменьшает сумму до доступной.
+        :param tx_params: транзакция с параметрами комиссии
+        :param balance: баланс, если уже получен
+        :param native_fees: L1 комиссия и газ, если уже получены (см. _add_native_fee_requests)
+        """
 
         amount = Amount(tx_params['value'], wei=True)
-        l1_fee = self._get_l1_fee(tx_params)
-        gues_gas = self.w3.eth.estimate_gas(
-            {'from': self.account.address, 'to': self.account.address, 'value': 1})
+        # недостающие данные запрашиваем одним batch запросом, параметры комиссии берем из tx_params
+        if balance is None or native_fees is None:
+            with self.batch() as batch:
+                if balance is None:
+                    batch.get_balance()
+                if native_fees is None:
+                    apply_native_fees = self._add_native_fee_requests(batch, tx_params)
+                results = iter(batch.execute())
+            if balance is None:
+                balance = next(results)
+            if native_fees is None:
+                native_fees = apply_native_fees(results)
+        l1_fee, gues_gas = native_fees
         gues_gas_price = tx_params.get('maxFeePerGas', tx_params.get('gasPrice'))
         fee_spend = self._multiply(l1_fee.wei + gues_gas * gues_gas_price, 1.1, 1.2)
-        balance = self.get_balance()
         if balance.wei - fee_spend - amount.wei > 0:
             return
 
@@ -205,60 +775,232 @@ class Onchain:
                    token: Optional[Token | str | ChecksumAddress] = None
                    ) -> str:
 
-        # если не передан токен, то отправляем нативный токен
-        if token is None:
-            token = Tokens.NATIVE_TOKEN
+        token = self._get_token(token)
+        if token.type_token == TokenTypes.NATIVE:
             token.chain = self.chain
             token.symbol = self.chain.native_token
 
-        if amount is None:
-            amount = Amount(self.get_balance(token=token).wei, decimals=token.decimals, wei=True)
-
-        # приводим адрес к формату checksum
+        # балансы, комиссия, nonce и газ запрашиваются одним batch запросом
+        tx_params, amount = self.prepare(to_address, amount, token)
         to_address = to_checksum(to_address)
 
-        # если передан адрес контракта, то получаем параметры токена и создаем объект Token
-        if isinstance(token, str):
-            symbol, decimals = self._get_token_params(token)
-            token = Token(symbol, token, self.chain, decimals)
-
-        # если передана сумма в виде числа, то создаем объект Amount
-        if not isinstance(amount, Amount):
-            amount = Amount(amount, decimals=token.decimals)
-
-        # если передан нативный токен
-        if token.type_token == TokenTypes.NATIVE:
-            tx_params = self._prepare_tx(amount, to_address)
-            self._validate_native_transfer_value(tx_params)
-            amount = Amount(tx_params['value'], wei=True)
-        else:
-            # получаем баланс кошелька
-            balance = self.get_balance(token=token)
-            if balance.wei < amount.wei:
-                amount = balance
-            if amount.wei <= 0:
-                logger.error(
-                    f'{self.account.profile_number}: Ошибка: Баланс: {amount.ether:.2f} {token.symbol}')
-                raise ValueError(f'Недостаточно средств для отправки транзакции!')
-
-            native_balance = Onchain(self.account, self.chain).get_balance()
-            if native_balance <= 0:
-                logger.error(
-                    f'{self.account.profile_number}: Ошибка: Нативный баланс недостаточный: {native_balance.ether:.5f} {self.chain.native_token}.')
-                raise ValueError(f'Недостаточно средств для отправки транзакции!')
-            # получаем контракт токена
-            contract = self._get_contract(token)
-            tx_params = self._prepare_tx()
-            # создаем транзакцию
-            tx_params = contract.functions.transfer(to_address, amount.wei).build_transaction(tx_params)
-
-        self._estimate_gas(tx_params)
         # подписываем и отправляем транзакцию
         tx_hash = self._sign_and_send(tx_params)
         message = f'Cумма: {amount} {token.symbol} | На адрес: {to_address} | Tx hash: {tx_hash}'
         logger.info(f'Транзакция отправлена! {message}')
         return tx_hash
 
+    def _send_many(self, txs: list[dict]) -> list[tuple[Optional[str], Optional[bool]]]:
+        """
+        Отправляет транзакции подряд с локальными nonce и один раз ждет все квитанции.
+        :param txs: готовые транзакции без nonce
+        :return: список (хэш, статус) в порядке транзакций: True - подтверждена, False - откатилась
+            или отклонена rpc (тогда хэш None), None - квитанцию не дождались, транзакция еще может пройти
+        """
+
+        tx_hashes, futures = [], []
+        for tx in txs:
+            try:
+                tx_hash = self._broadcast(tx)
+            except (ValueError, Web3RPCError) as error:
+                logger.error(f'{self.account.profile_number} Транзакция не принята сетью: {error}')
+                tx_hashes.append(None)
+                futures.append(None)
+                continue
+            except Exception as error:
+                if 'nonce' not in tx:
+                    logger.error(f'{self.account.profile_number} Транзакция не отправлена: {error}')
+                    tx_hashes.append(None)
+                    futures.append(None)
+                    continue
+                # в сети транзакция не найдена, но может еще дойти, подпись детерминирована, хэш тот же
+                tx_hash = self.w3.eth.account.sign_transaction(tx, self.account.private_key).hash
+                logger.warning(f'{self.account.profile_number} Нет ответа на отправку транзакции '
+                               f'{tx_hash.to_0x_hex()}, ждем ее квитанцию: {error}')
+            tx_hashes.append(tx_hash.hex())
+            futures.append(self._track(tx, tx_hash))
+
+        results = []
+        for tx_hash, future in zip(tx_hashes, futures):
+            if future is None:
+                results.append((None, False))
+                continue
+            try:
+                tx_receipt = future.result()
+            except TimeoutError:
+                results.append((tx_hash, None))
+                continue
+            results.append((tx_hash, tx_receipt['status'] == 1))
+        return results
+
+    def _disperse_individually(self, recipients: list[tuple[ChecksumAddress, Amount]],
+                               token: Token) -> list[tuple[Optional[str], Optional[bool]]]:
+
+        txs = []
+        for address, amount in recipients:
+            try:
+                tx_params, _ = self.prepare(address, amount, token)
+            except Exception as error:
+                logger.error(f'{self.account.profile_number} Не удалось подготовить перевод на {address}: {error}')
+                tx_params = None
+            txs.append(tx_params)
+
+        results = iter(self._send_many([tx for tx in txs if tx is not None]))
+        return [next(results) if tx is not None else (None, False) for tx in txs]
+
+    def _disperse_native(self,
+                         recipients: list[tuple[ChecksumAddress, Amount]]) -> list[tuple[Optional[str], Optional[bool]]]:
+
+        multicall = self.w3.eth.contract(to_checksum(self.chain.multicall_address), abi=MULTICALL3_ABI)
+        with self.batch() as batch:
+            batch.get_balance()
+            batch.block_gas_limit()
+            apply_prerequisites = self._add_tx_prerequisites(batch)
+            results = iter(batch.execute())
+        balance, block_gas_limit = next(results), next(results)
+        apply_prerequisites(results)
+
+        total = sum(amount.wei for _, amount in recipients)
+        if total >= balance.wei:
+            logger.error(f'{self.account.profile_number} Недостаточно средств для рассылки: '
+                         f'баланс {balance}, нужно {Amount(total, wei=True)} {self.chain.native_token}')
+            raise ValueError('Недостаточно средств для рассылки нативного токена')
+
+        # пачка занимает не больше половины блока, иначе транзакция может долго не попасть в блок
+        chunk_size = max(1, min(config.disperse_chunk_size, block_gas_limit // 2 // DISPERSE_TRANSFER_GAS))
+        chunks = [list(range(start, min(start + chunk_size, len(recipients))))
+                  for start in range(0, len(recipients), chunk_size)]
+
+        # allowFailure=False: если один перевод не прошел, откатывается вся пачка и деньги не застревают в multicall
+        tx_params = self._prepare_tx()
+        txs = []
+        for chunk in chunks:
+            calls = [(recipients[index][0], False, recipients[index][1].wei, b'') for index in chunk]
+            value = sum(recipients[index][1].wei for index in chunk)
+            txs.append(self._build_contract_tx(multicall, 'aggregate3Value', [calls], dict(tx_params, value=value)))
+
+        with self.batch() as batch:
+            for tx in txs:
+                batch.estimate_gas(tx, allow_failure=True)
+            estimated_gases = batch.execute()
+
+        sent_chunks, sent_txs, failed = [], [], []
+        for chunk, tx, estimated_gas in zip(chunks, txs, estimated_gases):
+            if estimated_gas is None:
+                failed.extend(chunk)
+                continue
+            tx['gas'] = int(estimated_gas * get_multiplayer())
+            sent_chunks.append(chunk)
+            sent_txs.append(tx)
+
+        results = [(None, False)] * len(recipients)
+        for chunk, (tx_hash, status) in zip(sent_chunks, self._send_many(sent_txs)):
+            # повторяем только откаченные и отклоненные пачки, пачка без квитанции еще может пройти
+            # и повтор заплатил бы получателям дважды
+            if status is False:
+                failed.extend(chunk)
+                continue
+            for index in chunk:
+                results[index] = (tx_hash, status)
+
+        if failed:
+            logger.warning(f'{self.account.profile_number} {len(failed)} переводов не прошли пачкой, '
+                           f'отправляем отдельными транзакциями')
+            failed_recipients = [recipients[index] for index in failed]
+            for index, result in zip(failed, self._disperse_individually(failed_recipients, Tokens.NATIVE_TOKEN)):
+                results[index] = result
+
+        return results
+
+    def _disperse_erc20(self, recipients: list[tuple[ChecksumAddress, Amount]],
+                        token: Token) -> list[tuple[Optional[str], Optional[bool]]]:
+
+        contract = self._get_contract(token)
+        txs = [self._build_contract_tx(contract, 'transfer', [address, amount.wei], {'from': self.account.address})
+               for address, amount in recipients]
+
+        # газ всех переводов оцениваем в batch запросах вместе с балансами
+        estimated_gases = []
+        chunk_size = config.disperse_chunk_size
+        with self.batch() as batch:
+            batch.get_balance(token=token)
+            batch.get_balance()
+            apply_prerequisites = self._add_tx_prerequisites(batch)
+            for tx in txs[:chunk_size]:
+                batch.estimate_gas(tx, allow_failure=True)
+            results = iter(batch.execute())
+        balance, native_balance = next(results), next(results)
+        apply_prerequisites(results)
+        estimated_gases.extend(results)
+        for start in range(chunk_size, len(txs), chunk_size):
+            with self.batch() as batch:
+                for tx in txs[start:start + chunk_size]:
+                    batch.estimate_gas(tx, allow_failure=True)
+                estimated_gases.extend(batch.execute())
+
+        total = sum(amount.wei for _, amount in recipients)
+        if total > balance.wei or native_balance.wei <= 0:
+            logger.error(f'{self.account.profile_number} Недостаточно средств для рассылки: баланс {balance} '
+                         f'{token.symbol}, нужно {Amount(total, decimals=token.decimals, wei=True)}, '
+                         f'нативный баланс {native_balance} {self.chain.native_token}')
+            raise ValueError('Недостаточно средств для рассылки токена')
+
+        fee_params = self._prepare_tx()
+        sent_txs = []
+        for (address, _), tx, estimated_gas in zip(recipients, txs, estimated_gases):
+            if estimated_gas is None:
+                logger.error(f'{self.account.profile_number} Не удалось оценить газ перевода {token.symbol} на {address}')
+                continue
+            tx.update(fee_params)
+            tx['gas'] = int(estimated_gas * get_multiplayer())
+            sent_txs.append(tx)
+
+        results = iter(self._send_many(sent_txs))
+        return [next(results) if estimated_gas is not None else (None, False) for estimated_gas in estimated_gases]
+
+    def disperse(
+            self,
+            recipients: list[tuple[str | ChecksumAddress, Amount | int | float]],
+            token: Optional[Token | str | ChecksumAddress] = None
+    ) -> list[tuple[ChecksumAddress, Optional[str], Optional[bool]]]:
+        """
+        Рассылка токена с одного кошелька на много адресов без ожидания каждой транзакции.
+        Нативный токен упаковывается в транзакции Multicall3 aggregate3Value, размер пачки ограничен газом блока,
+        откаченные и отклоненные пачки отправляются отдельными переводами. Пачки, квитанцию которых
+        не дождались за config.receipt_timeout, повторно не отправляются.
+        ERC20 отправляется отдельными переводами подряд с локальными nonce.
+        Газ всех переводов оценивается batch запросами, получатель, перевод на которого не проходит оценку
+        (например адрес в черном списке токена или контракт без payable receive), пропускается один,
+        остальные переводы его пачки отправляются.
+        :param recipients: список (адрес, сумма)
+        :param token: токен или адрес контракта, по умолчанию нативный токен
+        :return: список (адрес, хэш транзакции, статус) в порядке получателей: True - перевод подтвержден,
+            False - не удался, None - статус неизвестен, проверьте транзакцию по хэшу перед повторной отправкой
+        """
+
+        token = self._get_token(token)
+        recipients = [
+            (to_checksum(address), amount if isinstance(amount, Amount) else Amount(amount, decimals=token.decimals))
+            for address, amount in recipients
+        ]
+        if not recipients:
+            return []
+
+        if token.type_token == TokenTypes.NATIVE:
+            symbol = self.chain.native_token
+            results = self._disperse_native(recipients)
+        else:
+            symbol = token.symbol
+            results = self._disperse_erc20(recipients, token)
+
+        confirmed = sum(1 for _, status in results if status)
+        logger.info(f'{self.account.profile_number} Рассылка {symbol}: успешно {confirmed} из {len(recipients)}')
+        unknown = [tx_hash for tx_hash, status in results if status is None]
+        if unknown:
+            logger.warning(f'{self.account.profile_number} Статус {len(unknown)} переводов неизвестен, не отправляйте '
+                           f'их повторно, пока не проверите транзакции: {", ".join(dict.fromkeys(map(str, unknown)))}')
+        return [(address, tx_hash, status) for (address, _), (tx_hash, status) in zip(recipients, results)]
+
     def _get_allowance(self, token: Token, spender: str | ChecksumAddress | ContractRaw) -> Amount:
 
         if isinstance(spender, ContractRaw):
@@ -278,49 +1020,59 @@ class Onchain:
         if token is None or token.type_token == TokenTypes.NATIVE:
             return
 
-        if self._get_allowance(token, spender).wei >= amount.wei:
-            return
-
         if isinstance(amount, (int, float)):
             amount = Amount(amount, decimals=token.decimals)
 
         if isinstance(spender, ContractRaw):
             spender = spender.address
+        spender = to_checksum(spender)
 
+        # allowance, оценка газа, комиссия и nonce одним batch запросом
         contract = self._get_contract(token)
-        tx_params = self._prepare_tx()
+        tx_params = self._build_contract_tx(contract, 'approve', [spender, amount.wei], {'from': self.account.address})
+        with self.batch() as batch:
+            batch.call(contract.functions.allowance(self.account.address, spender),
+                       lambda result: Amount(result, decimals=token.decimals, wei=True))
+            batch.estimate_gas(dict(tx_params), allow_failure=True)
+            apply_prerequisites = self._add_tx_prerequisites(batch)
+            results = iter(batch.execute())
+        allowance, estimated_gas = next(results), next(results)
+        apply_prerequisites(results)
+
+        if allowance.wei >= amount.wei:
+            return
 
-        tx_params = contract.functions.approve(spender, amount.wei).build_transaction(tx_params)
-        self._estimate_gas(tx_params)
+        tx_params.update(self._prepare_tx())
+        self._set_gas(tx_params, estimated_gas)
         self._sign_and_send(tx_params)
         message = f'approve {amount} {token.symbol} to {spender}'
         logger.info(f'{self.account.profile_number} Транзакция отправлена {message}')
 
-    def get_gas_price(self, gwei: bool = True) -> int:
+    def get_gas_price(self, gwei: bool = True) -> int | float:
 
-        gas_price = self.w3.eth.gas_price
+        gas_price = FeeOracle.get(self.chain).get_fees(self).gas_price
         if gwei:
             return gas_price / 10 ** 9
         return gas_price
 
     def gas_price_wait(self, gas_limit: int = None) -> None:
 
+        # лимит можно задать для каждой сети в config.gas_price_limits
         if not gas_limit:
-            gas_limit = config.gas_price_limit
+            gas_limit = GasMonitor.get_limit(self.chain)
 
-        while self.get_gas_price() > gas_limit:
-            logger.warning(f'Цена Gas высокая: {self.get_gas_price()}! Ожидаем снижение.')
-            random_sleep(20, 30)
+        gas_price = self.get_gas_price()
+        if gas_price <= gas_limit:
+            return
 
-        if self.get_gas_price() < gas_limit:
-            logger.success(f'Цена Gas восстановлена: {self.get_gas_price()}! Продолжаем активности.')
+        logger.warning(f'Цена Gas высокая: {gas_price}! Ожидаем снижение.')
+        gas_price = GasMonitor.get(self.chain, self.proxy).wait_below(gas_limit)
+        logger.success(f'Цена Gas восстановлена: {gas_price}! Продолжаем активности.')
 
     def get_pk_from_seed(self, seed: str | list) -> str:
 
-        EthAccount.enable_unaudited_hdwallet_features()
-        if isinstance(seed, list):
-            seed = ' '.join(seed)
-        return EthAccount.from_mnemonic(seed).key.hex()
+        # вывод ключа из сид фразы дорогой, результат кэшируется на время работы
+        return KeyDerivation.get_key(seed)[0]
 
     def is_eip_1559(self) -> bool:
 
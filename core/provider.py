@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+import requests
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from web3 import HTTPProvider, Web3
+from web3.middleware import AttributeDictMiddleware
+from web3.types import RPCEndpoint, RPCResponse
+
+from config import config, Chains
+from models.chain import Chain
+from utils import codec
+from utils.utils import prepare_proxy_requests
+
+# методы только на чтение, которые безопасно дублировать на второй rpc, см. config.is_hedged_reads
+HEDGED_METHODS = {
+    'eth_getBalance',
+    'eth_getTransactionCount',
+    'eth_call',
+    'eth_getCode',
+    'eth_estimateGas',
+    'eth_gasPrice',
+    'eth_feeHistory',
+}
+
+# облегченный набор middleware для Onchain: без проверки chainId через eth_chainId на каждый eth_call,
+# без ENS, стратегии цены газа и оценки газа для eth_sendTransaction, которые Onchain не использует
+LEAN_MIDDLEWARE = [(AttributeDictMiddleware, 'attrdict')]
+
+
+class RpcEndpoint:
+    """
+    Состояние одного rpc endpoint: EWMA задержки и доли ошибок, circuit breaker.
+    После config.rpc_breaker_failures ошибок подряд endpoint выключается на config.rpc_breaker_cooldown секунд.
+    """
+
+    _alpha = 0.3
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self._latencies: deque[float] = deque(maxlen=100)
+
+    @property
+    def is_available(self) -> bool:
+
+        return time.monotonic() >= self.open_until
+
+    @property
+    def score(self) -> float:
+
+        # endpoint без замеров получает первый запрос, чтобы его измерить
+        return (self.latency or 0.0) * (1 + 4 * self.error_rate)
+
+    @property
+    def p90(self) -> Optional[float]:
+
+        # пока замеров мало, перцентиль ничего не говорит
+        if len(self._latencies) < 10:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[int(len(latencies) * 0.9)]
+
+    def record_success(self, latency: float) -> None:
+
+        self._latencies.append(latency)
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = self._alpha * latency + (1 - self._alpha) * self.latency
+        self.error_rate *= 1 - self._alpha
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, error: Exception) -> None:
+
+        self.error_rate = self._alpha + (1 - self._alpha) * self.error_rate
+        self.failures += 1
+        if self.failures >= config.rpc_breaker_failures:
+            self.open_until = time.monotonic() + config.rpc_breaker_cooldown
+            logger.warning(f'RPC {self.url} отключен на {config.rpc_breaker_cooldown} сек. после ошибок: {error}')
+
+
+class RpcSession:
+    """
+    Общая keep-alive сессия к rpc провайдерам сети для одного прокси.
+    Подменяет менеджер сессий web3, поэтому все Onchain с одинаковыми rpc и прокси
+    используют один пул соединений и не делают повторный TLS handshake.
+    Запрос уходит на самый быстрый исправный endpoint, при 429/5xx и сетевых ошибках - на следующий.
+    """
+
+    # общий на процесс пул потоков для дублирующих запросов
+    _hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='rpc-hedge')
+
+    def __init__(self, rpcs: list[str], proxy: Optional[str] = None) -> None:
+        self.rpc = rpcs[0]
+        self.endpoints = [RpcEndpoint(rpc) for rpc in rpcs]
+        self.proxy = proxy
+        self.is_warm = False
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(rpcs), pool_maxsize=config.rpc_pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.proxies.update(prepare_proxy_requests(proxy))
+
+    def cache_and_return_session(self, *args, **kwargs) -> requests.Session:
+
+        return self.session
+
+    def get_endpoints(self) -> list[RpcEndpoint]:
+
+        # сначала исправные по скорости, выключенные - в конце, на случай если упали все
+        with self._lock:
+            available = sorted((endpoint for endpoint in self.endpoints if endpoint.is_available),
+                               key=lambda endpoint: endpoint.score)
+            broken = sorted((endpoint for endpoint in self.endpoints if not endpoint.is_available),
+                            key=lambda endpoint: endpoint.open_until)
+        return available + broken
+
+    def post(self, endpoint: RpcEndpoint, data: bytes | str, **kwargs) -> bytes:
+
+        kwargs.setdefault('timeout', config.rpc_timeout)
+        started = time.monotonic()
+        try:
+            with self.session.post(endpoint.url, data=data, **kwargs) as response:
+                response.raise_for_status()
+                content = response.content
+        except requests.HTTPError as error:
+            status_code = error.response.status_code if error.response is not None else 0
+            if status_code == 429 or status_code >= 500:
+                with self._lock:
+                    endpoint.record_failure(error)
+            raise error
+        except (requests.ConnectionError, requests.Timeout) as error:
+            with self._lock:
+                endpoint.record_failure(error)
+            raise error
+
+        with self._lock:
+            endpoint.record_success(time.monotonic() - started)
+        return content
+
+    @staticmethod
+    def is_hedged(data: bytes | str) -> bool:
+
+        if not config.is_hedged_reads:
+            return False
+        try:
+            payload = codec.loads(data)
+        except ValueError:
+            return False
+        requests_list = payload if isinstance(payload, list) else [payload]
+        return all(request.get('method') in HEDGED_METHODS for request in requests_list)
+
+    def post_sequential(self, endpoints: list[RpcEndpoint], data: bytes | str, **kwargs) -> bytes:
+
+        last_error = None
+        for endpoint in endpoints:
+            try:
+                return self.post(endpoint, data, **kwargs)
+            except requests.HTTPError as error:
+                status_code = error.response.status_code if error.response is not None else 0
+                if status_code != 429 and status_code < 500:
+                    raise error
+                last_error = error
+            except (requests.ConnectionError, requests.Timeout) as error:
+                last_error = error
+            logger.debug(f'RPC {endpoint.url} не ответил: {last_error}, пробуем следующий')
+        raise last_error
+
+    def post_hedged(self, endpoints: list[RpcEndpoint], data: bytes | str, **kwargs) -> bytes:
+        """
+        Отправляет запрос на основной rpc, если он не ответил за свой p90, дублирует запрос на второй.
+        Возвращается первый успешный ответ, опоздавший запрос завершается в фоне и только обновляет статистику.
+        :param endpoints: rpc в порядке приоритета, минимум два
+        :param data: тело JSON-RPC запроса
+        :return: тело ответа
+        """
+
+        primary, secondary = endpoints[0], endpoints[1]
+        with self._lock:
+            delay = primary.p90 or config.hedge_delay
+
+        futures = [self._hedge_executor.submit(self.post, primary, data, **kwargs)]
+        done, _ = wait(futures, timeout=delay)
+        if done and futures[0].exception() is None:
+            return futures[0].result()
+
+        futures.append(self._hedge_executor.submit(self.post, secondary, data, **kwargs))
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+
+        if len(endpoints) > 2:
+            return self.post_sequential(endpoints[2:], data, **kwargs)
+        raise last_error
+
+    def make_post_request(self, endpoint_uri: str, data: bytes | str, **kwargs) -> bytes:
+
+        endpoints = self.get_endpoints()
+        if len(endpoints) > 1 and self.is_hedged(data):
+            return self.post_hedged(endpoints, data, **kwargs)
+        return self.post_sequential(endpoints, data, **kwargs)
+
+    def warm_up(self) -> None:
+
+        # любой дешевый запрос открывает соединение, которое остается в пуле, и дает первый замер задержки
+        for endpoint in self.endpoints:
+            try:
+                self.post(
+                    endpoint,
+                    b'{"jsonrpc":"2.0","method":"eth_chainId","params":[],"id":0}',
+                    headers={'Content-Type': 'application/json'}
+                )
+            except requests.RequestException as error:
+                logger.warning(f'Не удалось прогреть соединение с {endpoint.url}: {error}')
+        self.is_warm = True
+
+    def close(self) -> None:
+
+        self.session.close()
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider, который отправляет запросы через общую RpcSession и кодирует JSON через utils.codec.
+    Если передан chain_id, eth_chainId и net_version отвечаются локально без запроса к rpc.
+    """
+
+    def __init__(self, rpc_session: RpcSession, request_kwargs: Optional[dict] = None,
+                 chain_id: Optional[int] = None) -> None:
+        super().__init__(rpc_session.rpc, request_kwargs=request_kwargs)
+        self._request_session_manager = rpc_session
+        self.chain_id = chain_id
+
+    def encode_rpc_request(self, method: RPCEndpoint, params: Any) -> bytes:
+
+        return codec.dumps({
+            'jsonrpc': '2.0',
+            'method': method,
+            'params': params or [],
+            'id': next(self.request_counter),
+        })
+
+    def encode_batch_rpc_request(self, requests_list: list[tuple[RPCEndpoint, Any]]) -> bytes:
+
+        return b'[' + b','.join(self.encode_rpc_request(method, params) for method, params in requests_list) + b']'
+
+    @staticmethod
+    def decode_rpc_response(raw_response: bytes) -> RPCResponse:
+
+        return codec.loads(raw_response)
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+
+        if self.chain_id is not None and method in ('eth_chainId', 'net_version'):
+            result = hex(self.chain_id) if method == 'eth_chainId' else str(self.chain_id)
+            return RPCResponse(jsonrpc='2.0', id=0, result=result)
+        return super().make_request(method, params)
+
+    def make_batch_request(self, batch_requests: list[tuple[RPCEndpoint, Any]]) -> list[RPCResponse]:
+        """
+        Отправляет запросы одним JSON-RPC batch запросом. Если rpc не принимает batch и ответил
+        одной ошибкой вместо списка ответов, запросы отправляются по одному.
+        Используется OnchainBatch (через web3), ReceiptTracker и BulkSender.
+        :param batch_requests: список (метод, параметры)
+        :return: ответы в порядке запросов, словари с result или error
+        """
+
+        if not batch_requests:
+            return []
+
+        raw_response = self._request_session_manager.make_post_request(
+            self.endpoint_uri, self.encode_batch_rpc_request(batch_requests), **self.get_request_kwargs()
+        )
+        responses = self.decode_rpc_response(raw_response)
+        is_batch = isinstance(responses, list) and len(responses) == len(batch_requests) \
+            and all(isinstance(response, dict) and response.get('id') is not None for response in responses)
+        if is_batch:
+            # порядок ответов в batch не гарантирован, id запросов растут в порядке добавления
+            return sorted(responses, key=lambda response: response['id'])
+
+        logger.debug(f'{self.endpoint_uri} не принимает batch запросы, отправляем по одному: {responses}')
+        return [self._make_single_request(method, params) for method, params in batch_requests]
+
+    def _make_single_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+
+        try:
+            return self.make_request(method, params)
+        except requests.RequestException as error:
+            return RPCResponse(jsonrpc='2.0', id=0, error={'code': -32603, 'message': str(error)})
+
+
+class ProviderRegistry:
+    """
+    Реестр rpc сессий на весь процесс, ключ - (rpc сети, прокси).
+    Открытыми держится не больше config.rpc_sessions_limit сессий, давно не использованные закрываются.
+    """
+
+    _sessions: OrderedDict[tuple[tuple[str, ...], Optional[str]], RpcSession] = OrderedDict()
+    _async_sessions: dict[int, ClientSession] = {}
+    _lock = threading.Lock()
+    # прогрев в фоне, пока аккаунт запускает браузер
+    _warm_up_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='rpc-warm-up')
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    @classmethod
+    def get_session(cls, rpcs: list[str], proxy: Optional[str] = None) -> RpcSession:
+
+        key = (tuple(rpcs), proxy)
+        with cls._lock:
+            rpc_session = cls._sessions.get(key)
+            if rpc_session:
+                cls.hits += 1
+                cls._sessions.move_to_end(key)
+                return rpc_session
+            cls.misses += 1
+            rpc_session = RpcSession(rpcs, proxy)
+            cls._sessions[key] = rpc_session
+            while len(cls._sessions) > max(config.rpc_sessions_limit, 1):
+                # соединения закрываются, сама сессия остается рабочей, если ее еще держит чей-то web3
+                _, evicted = cls._sessions.popitem(last=False)
+                evicted.close()
+                cls.evictions += 1
+            return rpc_session
+
+    @staticmethod
+    def get_proxy(proxy: Optional[str]) -> Optional[str]:
+
+        # прокси аккаунта для rpc используется только при config.is_web3_proxy
+        return proxy if config.is_web3_proxy else None
+
+    @classmethod
+    def get_provider(cls, chain: Chain, proxy: Optional[str] = None,
+                     request_kwargs: Optional[dict] = None) -> PooledHTTPProvider:
+
+        chain_id = chain.chain_id if config.is_lean_provider else None
+        return PooledHTTPProvider(cls.get_session(chain.rpcs, proxy), request_kwargs, chain_id)
+
+    @classmethod
+    def get_web3(cls, chain: Chain, proxy: Optional[str] = None, request_kwargs: Optional[dict] = None) -> Web3:
+        """
+        Web3 на общем пуле соединений, при config.is_lean_provider - с облегченным набором middleware.
+        :param chain: сеть
+        :param proxy: прокси
+        :param request_kwargs: параметры запросов, например заголовки
+        :return: Web3
+        """
+
+        provider = cls.get_provider(chain, proxy, request_kwargs)
+        if config.is_lean_provider:
+            return Web3(provider, middleware=LEAN_MIDDLEWARE)
+        return Web3(provider)
+
+    @classmethod
+    async def get_async_session(cls) -> ClientSession:
+
+        # aiohttp сессия привязана к event loop, поэтому храним одну сессию на каждый loop
+        loop_id = id(asyncio.get_running_loop())
+        session = cls._async_sessions.get(loop_id)
+        if session is None or session.closed:
+            session = ClientSession(
+                connector=TCPConnector(limit=config.async_rpc_limit, ttl_dns_cache=300),
+                timeout=ClientTimeout(total=config.rpc_timeout)
+            )
+            cls._async_sessions[loop_id] = session
+        return session
+
+    @classmethod
+    async def close_async_session(cls) -> None:
+
+        session = cls._async_sessions.pop(id(asyncio.get_running_loop()), None)
+        if session and not session.closed:
+            await session.close()
+
+    @classmethod
+    def warm_up(cls, proxy: Optional[str] = None, chains: Optional[list[Chain]] = None) -> None:
+        """
+        Открывает соединения со всеми rpc сетей через прокси, уже прогретые сессии пропускаются.
+        :param proxy: прокси, как его передают в get_web3
+        :param chains: сети, по умолчанию все сети Chains
+        """
+
+        if chains is None:
+            chains = Chains.get_chains_list()
+
+        sessions = [cls.get_session(chain.rpcs, proxy) for chain in chains]
+        sessions = [rpc_session for rpc_session in sessions if not rpc_session.is_warm]
+        if not sessions:
+            return
+
+        with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+            list(executor.map(RpcSession.warm_up, sessions))
+
+    @classmethod
+    def warm_up_account(cls, account_proxy: Optional[str], chains: list[Chain]) -> None:
+        """
+        Прогревает в фоне сессии, которые будет использовать Onchain аккаунта.
+        :param account_proxy: прокси аккаунта, при выключенном config.is_web3_proxy прогреваются сессии без прокси
+        :param chains: сети аккаунта
+        """
+
+        proxy = cls.get_proxy(account_proxy)
+        cls._warm_up_executor.submit(cls._warm_up_quietly, proxy, chains)
+
+    @classmethod
+    def _warm_up_quietly(cls, proxy: Optional[str], chains: list[Chain]) -> None:
+
+        try:
+            cls.warm_up(proxy, chains)
+        except Exception as error:
+            logger.debug(f'Не удалось прогреть rpc сессии: {error}')
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+
+        return {'sessions': len(cls._sessions), 'hits': cls.hits, 'misses': cls.misses, 'evictions': cls.evictions}
+
+    @classmethod
+    def log_stats(cls) -> None:
+
+        stats = cls.stats()
+        logger.info(f'RPC пул: сессий {stats["sessions"]}, попаданий {stats["hits"]}, промахов {stats["misses"]}, '
+                    f'закрыто старых {stats["evictions"]}')
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        Закрывает все rpc сессии и пишет статистику пула, вызывается при завершении программы.
+        """
+
+        if not cls.misses:
+            return
+        cls.log_stats()
+        with cls._lock:
+            sessions = list(cls._sessions.values())
+            cls._sessions.clear()
+        for rpc_session in sessions:
+            rpc_session.close()
+
+
+# соединения закрываются и статистика пула пишется при завершении программы
+atexit.register(ProviderRegistry.close_all)
+
+if __name__ == '__main__':
+    pass
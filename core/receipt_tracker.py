@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from hexbytes import HexBytes
+from loguru import logger
+
+from config import config
+from core.provider import ProviderRegistry
+from models.chain import Chain
+
+
+class ReceiptTracker:
+    """
+    Фоновое отслеживание квитанций транзакций одной сети.
+    Все неподтвержденные хэши проверяются одним JSON-RPC batch запросом раз в блок,
+    результат приходит в Future, который возвращает track().
+    """
+
+    _trackers: dict[tuple[str, Optional[str]], ReceiptTracker] = {}
+    _trackers_lock = threading.Lock()
+
+    def __init__(self, chain: Chain, proxy: Optional[str] = None) -> None:
+        self.chain = chain
+        self.w3 = ProviderRegistry.get_web3(chain, proxy)
+        self._pending: dict[HexBytes, tuple[Future, str, float]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def get(cls, chain: Chain, proxy: Optional[str] = None) -> ReceiptTracker:
+
+        key = (chain.name, proxy)
+        with cls._trackers_lock:
+            tracker = cls._trackers.get(key)
+            if tracker is None:
+                tracker = cls(chain, proxy)
+                cls._trackers[key] = tracker
+            return tracker
+
+    def track(self, tx_hash: HexBytes, label: str | int = '') -> Future:
+        """
+        Добавляет транзакцию в отслеживание.
+        :param tx_hash: хэш отправленной транзакции
+        :param label: подпись для логов, обычно номер профиля
+        :return: Future с квитанцией транзакции
+        """
+
+        future = Future()
+        with self._lock:
+            self._pending[HexBytes(tx_hash)] = (future, str(label), time.monotonic() + config.receipt_timeout)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f'receipts-{self.chain.name}', daemon=True)
+                self._thread.start()
+        return future
+
+    def _run(self) -> None:
+
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                tx_hashes = list(self._pending)
+
+            try:
+                receipts = self._get_receipts(tx_hashes)
+            except Exception as error:
+                logger.warning(f'{self.chain.name} Ошибка запроса квитанций: {error}')
+                receipts = [None] * len(tx_hashes)
+
+            now = time.monotonic()
+            for tx_hash, receipt in zip(tx_hashes, receipts):
+                with self._lock:
+                    future, label, deadline = self._pending[tx_hash]
+                    if receipt is None and now < deadline:
+                        continue
+                    del self._pending[tx_hash]
+                self._resolve(future, label, tx_hash, receipt)
+
+            time.sleep(max(self.chain.block_time, 1.0))
+
+    def _get_receipts(self, tx_hashes: list[HexBytes]) -> list[Optional[dict]]:
+
+        requests = [('eth_getTransactionReceipt', [tx_hash.to_0x_hex()]) for tx_hash in tx_hashes]
+        # rpc без поддержки batch PooledHTTPProvider опрашивает по одному хэшу, ответ всегда список
+        responses = self.w3.provider.make_batch_request(requests)
+        return [self._format_receipt(response.get('result')) for response in responses]
+
+    @staticmethod
+    def _format_receipt(receipt: Optional[dict]) -> Optional[dict]:
+
+        if receipt is None:
+            return None
+        receipt = dict(receipt)
+        for field in ('status', 'gasUsed', 'blockNumber', 'effectiveGasPrice'):
+            if isinstance(receipt.get(field), str):
+                receipt[field] = int(receipt[field], 16)
+        receipt['transactionHash'] = HexBytes(receipt['transactionHash'])
+        return receipt
+
+    def _resolve(self, future: Future, label: str, tx_hash: HexBytes, receipt: Optional[dict]) -> None:
+
+        if receipt is None:
+            logger.error(f'{label} Не дождались квитанции транзакции {tx_hash.to_0x_hex()} в сети {self.chain.name}')
+            future.set_exception(TimeoutError(f'Таймаут ожидания транзакции {tx_hash.to_0x_hex()}'))
+            return
+
+        if receipt['status'] == 1:
+            logger.success(f'{label} Транзакция {tx_hash.to_0x_hex()} подтверждена в сети {self.chain.name}')
+        else:
+            logger.error(f'{label} Транзакция {tx_hash.to_0x_hex()} завершилась с ошибкой в сети {self.chain.name}')
+        future.set_result(receipt)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+from loguru import logger
+from openpyxl import Workbook, load_workbook
+
+from config import config
+from core.excel import Excel
+from models.account import Account
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cells (
+    book TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    value,
+    PRIMARY KEY (book, row, col)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cells_by_value ON cells (book, col, value);
+"""
+
+ACCOUNTS_HEADERS = ['Profile Number', 'Address', 'Password', 'Seed', 'Private Key', 'Proxy']
+
+
+class SqliteStorage:
+    """
+    Хранилище с API Excel на базе SQLite (config.PATH_DB) в режиме WAL.
+    Каждая таблица excel - книга в общей таблице cells с теми же номерами строк и столбцов:
+    в строке 1 заголовки, в столбце 1 номера профилей. Изменения записываются сразу,
+    счетчики увеличиваются атомарно, поэтому с базой можно работать из нескольких процессов.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, account: Optional[Account] = None, file: Optional[str] = None) -> None:
+
+        self.account = account
+        self._book = self._get_book(file)
+        self._create_book()
+        if account:
+            self.acc_row = self._find_acc_row(str(self.account.profile_number))
+
+    def __enter__(self) -> SqliteStorage:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.flush()
+
+    @classmethod
+    def _connection(cls) -> sqlite3.Connection:
+
+        # sqlite3 соединение нельзя делить между потоками, у каждого потока свое
+        connection = getattr(cls._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(config.PATH_DB, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            cls._local.connection = connection
+        return connection
+
+    @classmethod
+    @contextmanager
+    def _transaction(cls) -> Iterator[sqlite3.Connection]:
+
+        # IMMEDIATE сразу берет блокировку записи, чтение и запись внутри не пересекаются с другими процессами
+        connection = cls._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _get_book(self, file: Optional[str]) -> str:
+
+        if not file:
+            return os.path.basename(config.PATH_EXCEL)
+        return file
+
+    def _create_book(self) -> None:
+
+        headers = ACCOUNTS_HEADERS if self._book == os.path.basename(config.PATH_EXCEL) else ACCOUNTS_HEADERS[:1]
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR IGNORE INTO cells (book, row, col, value) VALUES (?, 1, ?, ?)',
+                [(self._book, col, header) for col, header in enumerate(headers, start=1)]
+            )
+
+    def flush(self) -> None:
+        """
+        Ничего не делает, изменения записываются сразу. Метод для совместимости с Excel.
+        """
+
+    @classmethod
+    def flush_all(cls, file: Optional[str] = None) -> None:
+        pass
+
+    def change_table(self, table_name: str) -> None:
+
+        self._book = table_name
+        self._create_book()
+
+    def connect_account(self, account: Account) -> None:
+
+        self.account = account
+        self.acc_row = self._find_acc_row(str(self.account.profile_number))
+
+    def _max(self, connection: sqlite3.Connection, field: str, condition: str) -> int:
+
+        return connection.execute(
+            f'SELECT COALESCE(MAX({field}), 1) FROM cells WHERE book = ? AND {condition}', (self._book,)
+        ).fetchone()[0]
+
+    def _find_acc_row(self, profile_number: str) -> int:
+
+        with self._transaction() as connection:
+            found = connection.execute(
+                'SELECT MIN(row) FROM cells WHERE book = ? AND col = 1 AND row > 1 AND value = ?',
+                (self._book, profile_number)
+            ).fetchone()[0]
+            if found:
+                return found
+            add_row = self._max(connection, 'row', 'row > 0') + 1
+            connection.execute('INSERT INTO cells (book, row, col, value) VALUES (?, ?, 1, ?)',
+                               (self._book, add_row, profile_number))
+        return add_row
+
+    def add_row(self, values: list) -> None:
+
+        with self._transaction() as connection:
+            add_row = self._max(connection, 'row', 'row > 0') + 1
+            connection.executemany(
+                'INSERT INTO cells (book, row, col, value) VALUES (?, ?, ?, ?)',
+                [(self._book, add_row, col, value) for col, value in enumerate(values, start=1) if value is not None]
+            )
+
+    def _set(self, connection: sqlite3.Connection, row: int, col_num: int, value: str | int | float) -> None:
+
+        connection.execute('INSERT OR REPLACE INTO cells (book, row, col, value) VALUES (?, ?, ?, ?)',
+                           (self._book, row, col_num, value))
+
+    def _get(self, connection: sqlite3.Connection, row: int, col_num: int) -> str | int | float | None:
+
+        found = connection.execute('SELECT value FROM cells WHERE book = ? AND row = ? AND col = ?',
+                                   (self._book, row, col_num)).fetchone()
+        return found[0] if found else None
+
+    def set_cell(self, column_name: str, value: str | int | float, row: Optional[int] = None) -> None:
+
+        row = self.acc_row if not row else row
+
+        col_num = self.find_column(column_name)
+        with self._transaction() as connection:
+            self._set(connection, row, col_num, value)
+
+    def add_column(self, column_name: str) -> int:
+
+        with self._transaction() as connection:
+            # столбец мог добавить другой процесс
+            found = connection.execute(
+                'SELECT MIN(col) FROM cells WHERE book = ? AND row = 1 AND value = ?', (self._book, column_name)
+            ).fetchone()[0]
+            if found:
+                return found
+            col_num = self._max(connection, 'col', 'row = 1') + 1
+            self._set(connection, 1, col_num, column_name)
+        return col_num
+
+    def find_column(self, column_name: str) -> int:
+
+        found = self._connection().execute(
+            'SELECT MIN(col) FROM cells WHERE book = ? AND row = 1 AND value = ?', (self._book, column_name)
+        ).fetchone()[0]
+        if found:
+            return found
+        logger.warning(f'{self.account.profile_number} Столбец {column_name} не найден, создаем новый.')
+        return self.add_column(column_name)
+
+    def get_cell(self, column_name: str, row: Optional[int] = None) -> str | int | None:
+
+        row = self.acc_row if not row else row
+
+        col_num = self.find_column(column_name)
+
+        return self._get(self._connection(), row, col_num)
+
+    def get_column(self, column_name: str, is_empty_pass: bool = False) -> list[str | int | None]:
+
+        col_num = self.find_column(column_name)
+        connection = self._connection()
+        max_row = self._max(connection, 'row', 'row > 0')
+        values = dict(connection.execute(
+            'SELECT row, value FROM cells WHERE book = ? AND col = ? AND row > 1', (self._book, col_num)
+        ).fetchall())
+        column_values = [values.get(row) for row in range(2, max_row + 1)]
+        if is_empty_pass:
+            return [value for value in column_values if value]
+        return column_values
+
+    def get_row(self, row: Optional[int] = None) -> list[str | int | None]:
+
+        row = self.acc_row if not row else row
+        connection = self._connection()
+        max_col = self._max(connection, 'col', 'row > 0')
+        values = dict(connection.execute(
+            'SELECT col, value FROM cells WHERE book = ? AND row = ?', (self._book, row)
+        ).fetchall())
+        return [values.get(col) for col in range(1, max_col + 1)]
+
+    @staticmethod
+    def _to_number(value: str | int | float | None, column_name: str) -> int | float:
+
+        if value is None:
+            return 0
+        if isinstance(value, str):
+            if value.isdigit():
+                return int(value)
+            if value.replace('.', '', 1).isdigit():
+                return float(value)
+            raise TypeError(f'Значение в столбце {column_name} не является числом')
+        return value
+
+    def get_counter(self, column_name: str, row: Optional[int] = None) -> int | float:
+
+        row = self.acc_row if not row else row
+
+        col_num = self.find_column(column_name)
+        with self._transaction() as connection:
+            value = self._get(connection, row, col_num)
+            number = self._to_number(value, column_name)
+            if number != value or type(number) is not type(value):
+                self._set(connection, row, col_num, number)
+        return number
+
+    def increase_counter(self, column_name: str, number: int = 1, row: Optional[int] = None) -> int:
+
+        row = self.acc_row if not row else row
+
+        col_num = self.find_column(column_name)
+        # чтение и запись в одной транзакции, параллельные увеличения не теряются
+        with self._transaction() as connection:
+            value = self._to_number(self._get(connection, row, col_num), column_name) + number
+            self._set(connection, row, col_num, value)
+        return value
+
+    def set_date(self, column_name: str, row: Optional[int] = None) -> None:
+
+        self.set_cell(column_name, datetime.now().strftime(config.date_format), row)
+
+    def get_date(self, column_name: str, row: Optional[int] = None) -> datetime:
+
+        date_str = self.get_cell(column_name, row)
+        if date_str:
+            date_object = datetime.strptime(date_str, config.date_format)
+            return date_object
+        logger.error(
+            f'{self.account.profile_number} Не нашли дату в столбце {column_name} возвращаем старую дату')
+        return datetime.now().replace(year=2000)
+
+    def get_counters(self, column_name: str) -> list[int | float]:
+
+        col_num = self.find_column(column_name)
+        with self._transaction() as connection:
+            max_row = self._max(connection, 'row', 'row > 0')
+            values = dict(connection.execute(
+                'SELECT row, value FROM cells WHERE book = ? AND col = ? AND row > 1', (self._book, col_num)
+            ).fetchall())
+            column_values = [self._to_number(values.get(row), column_name) for row in range(2, max_row + 1)]
+            connection.executemany(
+                'INSERT OR REPLACE INTO cells (book, row, col, value) VALUES (?, ?, ?, ?)',
+                [(self._book, row, col_num, value) for row, value in enumerate(column_values, start=2)]
+            )
+        return column_values
+
+    @classmethod
+    def get_books(cls) -> list[str]:
+
+        return [book for (book,) in cls._connection().execute('SELECT DISTINCT book FROM cells ORDER BY book')]
+
+    @classmethod
+    def export_book(cls, book: str) -> str:
+        """
+        Выгружает книгу базы в файл .xlsx одним проходом, файл перезаписывается.
+        :param book: имя книги, совпадает с именем файла, например 'SoneiumActivity.xlsx'
+        :return: полный путь к файлу
+        """
+
+        file = os.path.join(config.PATH_DATA, book)
+        table = Workbook(write_only=True)
+        sheet = table.create_sheet()
+        current_row, values = 1, []
+        cursor = cls._connection().execute(
+            'SELECT row, col, value FROM cells WHERE book = ? ORDER BY row, col', (book,)
+        )
+        for row, col, value in cursor:
+            while current_row < row:
+                sheet.append(values)
+                current_row, values = current_row + 1, []
+            values.extend([None] * (col - len(values) - 1))
+            values.append(value)
+        sheet.append(values)
+        table.save(file)
+        return file
+
+    @classmethod
+    def import_book(cls, book: str) -> int:
+        """
+        Загружает файл .xlsx в базу одним проходом, прежнее содержимое книги заменяется.
+        :param book: имя файла в config/data, например 'SoneiumActivity.xlsx'
+        :return: число загруженных строк с данными, без заголовка
+        """
+
+        file = os.path.join(config.PATH_DATA, book)
+        # несохраненные изменения этого файла в текущем процессе
+        Excel.flush_all(file)
+        table = load_workbook(file, read_only=True)
+        try:
+            rows = table.active.iter_rows(values_only=True)
+            with cls._transaction() as connection:
+                connection.execute('DELETE FROM cells WHERE book = ?', (book,))
+                count = 0
+                for row, values in enumerate(rows, start=1):
+                    cells = []
+                    for col, value in enumerate(values, start=1):
+                        if value is None:
+                            continue
+                        # номера профилей ищутся как строки, как их записывает Excel
+                        if col == 1 and row > 1:
+                            value = str(value)
+                        cells.append((book, row, col, value))
+                    connection.executemany('INSERT INTO cells (book, row, col, value) VALUES (?, ?, ?, ?)', cells)
+                    count = row - 1
+        finally:
+            table.close()
+        return count
+
+
+def get_storage(account: Optional[Account] = None, file: Optional[str] = None) -> Excel | SqliteStorage:
+    """
+    Создает хранилище отчета по config.storage_backend.
+    :param account: аккаунт, к строке которого привязывается хранилище
+    :param file: имя таблицы, например 'SoneiumActivity.xlsx', по умолчанию accounts.xlsx
+    :return: Excel или SqliteStorage с одинаковым API
+    """
+
+    if config.storage_backend == 'sqlite':
+        return SqliteStorage(account, file)
+    return Excel(account, file)
+
+
+def main() -> None:
+    """
+    Выгрузка базы в .xlsx и загрузка .xlsx в базу.
+    Запуск из корня проекта:
+    python -m core.storage export [файл] - все книги или одна, файлы пишутся в config/data
+    python -m core.storage import <файл> - файл из config/data
+    """
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    books = sys.argv[2:]
+    if command == 'export':
+        for book in books or SqliteStorage.get_books():
+            logger.success(f'Книга {book} выгружена в {SqliteStorage.export_book(book)}')
+    elif command == 'import' and books:
+        for book in books:
+            logger.success(f'Файл {book} загружен в базу, строк: {SqliteStorage.import_book(book)}')
+    else:
+        print(main.__doc__)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Optional
+
+from eth_typing import ChecksumAddress
+from loguru import logger
+
+from config import config, Tokens
+from models.chain import Chain
+
+
+class TokenMetadataCache:
+    """
+    Кэш symbol и decimals токенов на диске, ключ - chain_id:адрес контракта.
+    При первом обращении заполняется токенами из config.Tokens.
+    """
+
+    _path = os.path.join(config.PATH_DATA, 'token_metadata.json')
+    _tokens: Optional[dict[str, tuple[str, int]]] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(chain: Chain, address: ChecksumAddress) -> str:
+
+        return f'{chain.chain_id}:{address}'
+
+    @classmethod
+    def _load(cls) -> dict[str, tuple[str, int]]:
+
+        if cls._tokens is not None:
+            return cls._tokens
+
+        tokens = {cls._key(token.chain, token.address): (token.symbol, token.decimals) for token in Tokens.get_tokens()}
+        if os.path.exists(cls._path):
+            try:
+                with open(cls._path, 'r') as file:
+                    tokens.update({key: tuple(value) for key, value in json.load(file).items()})
+            except (OSError, json.JSONDecodeError) as error:
+                logger.warning(f'Не удалось прочитать кэш токенов {cls._path}: {error}')
+        cls._tokens = tokens
+        return tokens
+
+    @classmethod
+    def get(cls, chain: Chain, address: ChecksumAddress) -> Optional[tuple[str, int]]:
+
+        with cls._lock:
+            return cls._load().get(cls._key(chain, address))
+
+    @classmethod
+    def set(cls, chain: Chain, address: ChecksumAddress, symbol: str, decimals: int) -> None:
+
+        with cls._lock:
+            tokens = cls._load()
+            tokens[cls._key(chain, address)] = (symbol, decimals)
+            # пишем во временный файл и подменяем, чтобы не оставить битый json при падении
+            tmp_path = f'{cls._path}.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump(tokens, file, indent=2)
+            os.replace(tmp_path, cls._path)
+
+
+if __name__ == '__main__':
+    pass
@@ -9,7 +9,7 @@ class Chain:
     def __init__(
             self,
             name: str,
-            rpc: str,
+            rpc: str | list[str],
             *,
             chain_id: int,
             metamask_name: Optional[str] = None,
@@ -18,9 +18,16 @@ class Chain:
             okx_name: str | None = None,
             binance_name: str | None = None,
             multiplier: float = 1.0,
+            block_time: float = 2.0,
+            native_transfer_gas: Optional[int] = 21000,
+            multicall_address: str = '0xcA11bde05977b3631167028862bE2a173976CA11',
+            ws: Optional[str] = None,
+            is_op_stack: bool = False,
     ):
         self.name = name
-        self.rpc = rpc
+        # можно передать несколько rpc, первый используется как основной (например в метамаске)
+        self.rpcs = [rpc] if isinstance(rpc, str) else list(rpc)
+        self.rpc = self.rpcs[0]
         self.chain_id = chain_id
         self.metamask_name = metamask_name if metamask_name else name
         self.native_token = native_token
@@ -28,6 +35,14 @@ class Chain:
         self.binance_name = binance_name
         self.is_eip1559 = is_eip1559
         self.multiplier = multiplier
+        self.block_time = block_time
+        # газ простого перевода нативного токена, None если в сети он не фиксирован
+        self.native_transfer_gas = native_transfer_gas
+        self.multicall_address = multicall_address
+        # websocket rpc для подписки на новые блоки, см. GasMonitor
+        self.ws = ws
+        # OP-stack сеть, к комиссии добавляется плата за L1 из GasPriceOracle, см. L1FeeOracle
+        self.is_op_stack = is_op_stack
 
     def __str__(self):
         return self.rpc
@@ -1,13 +1,14 @@
+import asyncio
+import random
+
 from loguru import logger
-from web3 import Web3, HTTPProvider
 from config import config, Chains
-from core.bot import Bot
-from core.onchain import Onchain
-from core.excel import Excel
+from core.async_onchain import AsyncOnchain
+from core.provider import ProviderRegistry
 from models.account import Account
 from models.chain import Chain
 from utils.logging import init_logger
-from utils.utils import (random_sleep, get_accounts, select_profiles, get_user_agent)
+from utils.utils import get_accounts, select_profiles
 
 
 
@@ -15,40 +16,49 @@ def main():
 
     init_logger()
     accounts = get_accounts()
+    asyncio.run(run_cycles(accounts))
 
-    for i in range(config.cycle):
+async def run_cycles(accounts: list[Account]) -> None:
 
-        accounts_for_work = select_profiles(accounts)
-        for account in accounts_for_work:
-            worker(account)
-            random_sleep(*config.pause_between_profile)
-        logger.success(f'Цикл {i + 1} завершен! Обработано {len(accounts_for_work)} аккаунтов.')
-        logger.info(f'Ожидание перед следующим циклом ~{config.pause_between_cycle[1]} секунд.')
-        random_sleep(*config.pause_between_cycle)
+    # все циклы и аккаунты работают в одном event loop с общей aiohttp сессией
+    try:
+        for i in range(config.cycle):
 
-def worker(account: Account) -> None:
+            accounts_for_work = select_profiles(accounts)
+            await count_accounts(accounts_for_work)
+            logger.success(f'Цикл {i + 1} завершен! Обработано {len(accounts_for_work)} аккаунтов.')
+            logger.info(f'Ожидание перед следующим циклом ~{config.pause_between_cycle[1]} секунд.')
+            await asyncio.sleep(random.uniform(*config.pause_between_cycle))
+    finally:
+        await ProviderRegistry.close_async_session()
 
-    try:
-        with Bot(account) as bot:
-            activity(bot)
-    except Exception as e:
-        logger.critical(f"Ошибка при обработке аккаунта {account}: {e}")
+async def count_accounts(accounts: list[Account]) -> None:
 
-def activity(bot: Bot):
+    # одновременно опрашивается не больше config.async_accounts_limit аккаунтов
+    semaphore = asyncio.Semaphore(config.async_accounts_limit)
 
-    get_user_agent()
-    chains = Chains.get_chains_list()
+    async def worker(account: Account) -> None:
+        async with semaphore:
+            try:
+                await count_transactions(account, Chains.get_chains_list())
+            except Exception as e:
+                logger.critical(f"Ошибка при обработке аккаунта {account.profile_number}: {e}")
 
-    for chain in chains:
+    await asyncio.gather(*(worker(account) for account in accounts))
+
+async def count_transactions(account: Account, chains: list[Chain]) -> None:
+
+    async def count_in_chain(chain: Chain) -> None:
         try:
-            onchain_instance = Onchain(bot.account, chain)
-            onchain_instance.get_tx_count(address=bot.account.address)
+            await AsyncOnchain(account, chain).get_tx_count(address=account.address)
         except Exception as e:
-            print(f'Ошибка в сети {chain.name.upper()}: {e}')
-            continue
+            logger.error(f'{account.profile_number} Ошибка в сети {chain.name.upper()}: {e}')
+
+    # все сети аккаунта опрашиваются одновременно
+    await asyncio.gather(*(count_in_chain(chain) for chain in chains))
 
 if __name__ == '__main__':
     try:
         main()
     except KeyboardInterrupt:
-        logger.warning('Программа завершена вручную!')
\ No newline at end of file
+        logger.warning('Программа завершена вручную!')
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError наследуется от json.JSONDecodeError, старые except продолжают работать
+JSONDecodeError = json.JSONDecodeError
+
+NAME = 'orjson' if orjson else 'json'
+
+
+def _default(obj: Any) -> Any:
+
+    # типы web3 в параметрах запросов, как в Web3JsonEncoder
+    if isinstance(obj, AttributeDict):
+        return dict(obj)
+    if isinstance(obj, (HexBytes, bytes)):
+        return HexBytes(obj).to_0x_hex()
+    raise TypeError(f'Тип {type(obj).__name__} не сериализуется в JSON')
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Кодирует объект в JSON, через orjson если он установлен.
+    :param obj: объект
+    :return: JSON в байтах, без пробелов между элементами
+    """
+
+    if orjson:
+        try:
+            return orjson.dumps(obj, default=_default)
+        except orjson.JSONEncodeError:
+            # например целые больше 64 бит, их понимает только стандартный json
+            pass
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    """
+    Декодирует JSON, через orjson если он установлен.
+    orjson читает целые больше 64 бит как float, rpc и биржи передают такие числа строками.
+    :param data: JSON в байтах или строке
+    :return: объект
+    """
+
+    if orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+if __name__ == '__main__':
+    pass
@@ -6,16 +6,21 @@ import secrets
 import string
 import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, Any
+from typing import Iterator, Optional, Any
 import requests
 from eth_typing import ChecksumAddress
 from web3 import Web3
 from loguru import logger
+from openpyxl import load_workbook
 from config.settings import config
 from core.excel import Excel
+from core.key_derivation import KeyDerivation
 from models.account import Account
 import re
 
+# столбцы accounts.xlsx в порядке аргументов Account
+ACCOUNT_COLUMNS = ('Profile Number', 'Address', 'Password', 'Private Key', 'Seed', 'Proxy')
+
 
 def select_profiles(accounts: list[Account]) -> list[Account]:
 
@@ -165,36 +170,53 @@ def send_telegram_message(message: str) -> None:
 def get_accounts() -> list[Account]:
 
     if config.accounts_source == 'excel':
-        accounts_raw_data = get_from_excel()
+        accounts = list(get_from_excel())
+        logger.info(f"Извлечено {len(accounts)} аккаунтов")
     else:
         accounts_raw_data = get_accounts_from_txt()
 
-    # Определяем количество аккаунтов
-    length = len(accounts_raw_data[0])
-    # Заполняем списки до нужной длины
-    combined_data = filler(length, *accounts_raw_data)
-    logger.info(f"Извлечено {length} аккаунтов")
+        # Определяем количество аккаунтов
+        length = len(accounts_raw_data[0])
+        # Заполняем списки до нужной длины
+        combined_data = filler(length, *accounts_raw_data)
+        logger.info(f"Извлечено {length} аккаунтов")
 
-    accounts = []
+        accounts = []
 
-    # ленивый генератор аккаунтов
-    for profile_number, address, password, private_key, seed, proxies in combined_data:
-        accounts.append(Account(profile_number, address, password, private_key, seed, proxies))
+        # ленивый генератор аккаунтов
+        for profile_number, address, password, private_key, seed, proxies in combined_data:
+            accounts.append(Account(profile_number, address, password, private_key, seed, proxies))
 
-    return accounts
+    # ключи из сид фраз и адреса из ключей выводим сразу для всех аккаунтов, параллельно и с кэшем
+    KeyDerivation.fill_accounts(accounts)
 
+    return accounts
 
-def get_from_excel() -> tuple[list[str], list[str], list[str], list[str], list[str], list[str]]:
 
-    excel = Excel(file='accounts.xlsx')
-    # Получаем данные из excel файла
-    profile_numbers = excel.get_column("Profile Number")
-    passwords = excel.get_column("Password")
-    addresses = excel.get_column("Address")
-    seeds = excel.get_column("Seed")
-    private_keys = excel.get_column("Private Key")
-    proxies = excel.get_column("Proxy")
-    return profile_numbers, addresses, passwords, private_keys, seeds, proxies
+def get_from_excel() -> Iterator[Account]:
+    """
+    Читает аккаунты из accounts.xlsx одним проходом, книга открывается только для чтения.
+    Отсутствующие столбцы дают None, пустые строки пропускаются.
+    :return: генератор аккаунтов в порядке строк таблицы
+    """
+
+    # несохраненные изменения файла в этом процессе, иначе прочитаем старую версию
+    Excel.flush_all(config.PATH_EXCEL)
+    if not os.path.exists(config.PATH_EXCEL):
+        Excel()  # создает таблицу с заголовками
+
+    table = load_workbook(config.PATH_EXCEL, read_only=True)
+    try:
+        rows = table.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        indices = [header.index(name) if name in header else None for name in ACCOUNT_COLUMNS]
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            yield Account(*(values[index] if index is not None and index < len(values) else None
+                            for index in indices))
+    finally:
+        table.close()
 
 
 def get_accounts_from_txt() -> tuple[list[str], list[str], list[str], list[str], list[str], list[str]]: